@@ -21,7 +21,7 @@
 #  MA 02110-1301, USA.
 #
 # 
-from operator import itemgetter
+import time
 from prioritydictionary import priorityDictionary
 from graph import DiGraph
 
@@ -35,109 +35,455 @@ from graph import DiGraph
 # to find K-1 deviations of the best path.
 
 ## Computes K paths from a source to a sink in the supplied graph.
+# The source and sink may each be a list or set of nodes, in which case the 
+# paths are the K best paths from any of the sources to any of the sinks, see
+# SuperGraph for the sets that are accepted. The 
+# container B never holds more potential paths than the amount of paths
+# still needed, since the worst of them could never become part of A. Once B
+# is full, the cost of its worst path bounds every spur search, so a spur 
+# search stops as soon as it cannot improve on the paths in B. See YenSearch 
+# for a version that stops within a time or work budget.
 #
 # @param graph A digraph of class Graph.
-# @param start The source node of the graph.
-# @param sink The sink node of the graph.
+# @param start The source node of the graph, or a list or set of nodes.
+# @param sink The sink node of the graph, or a list or set of nodes.
 # @param K The amount of paths being computed.
+# @param trace A tracer.YenTrace that records every step of the algorithm, if 
+# not specified nothing is recorded.
 #
-# @retval [] Array of paths, where [0] is the shortest, [1] is the next 
+# @retval [] Array of Path objects, where [0] is the shortest, [1] is the next
 # shortest, and so on.
 #
-def ksp_yen(graph, node_start, node_end, max_k=2):
-    distances, previous = dijkstra(graph, node_start)
+def ksp_yen(graph, node_start, node_end, max_k=2, trace=None):
+    A = list(_yen(graph, node_start, node_end, max_k, None, trace, None))
     
-    A = [{'cost': distances[node_end], 
-          'path': path(previous, node_start, node_end)}]
+    if not A:
+        A = [Path(graph.INFINITY, ())]
+    
+    return A
+
+## Enumerates every loopless path from a source to a sink whose cost does not
+# exceed a budget. The paths are generated lazily in order of cost, so the 
+# caller can stop at any point. The distance from every node to the sink is 
+# computed once and used as a lower bound, so a spur node or partial path that
+# cannot reach the sink within the budget is never expanded.
+#
+# @param graph A digraph of class Graph.
+# @param node_start The source node of the graph, or a list or set of nodes.
+# @param node_end The sink node of the graph, or a list or set of nodes.
+# @param max_cost The maximum cost of a path.
+# @param trace A tracer.YenTrace that records every step of the algorithm, if 
+# not specified nothing is recorded.
+#
+# @retval iter An iterator of Path objects, where the first is the shortest, 
+# the second the next shortest, and so on.
+#
+def ksp_budget(graph, node_start, node_end, max_cost, trace=None):
+    return _yen(graph, node_start, node_end, None, max_cost, trace, None)
+
+## Generates the paths of Yen's algorithm in order of cost.
+#
+# @param graph A digraph of class Graph.
+# @param node_start The source node of the graph.
+# @param node_end The sink node of the graph.
+# @param max_k The amount of paths being computed, or None for no limit.
+# @param max_cost The maximum cost of a path, or None for no limit.
+# @param trace A tracer.YenTrace, or None.
+# @param budget The YenSearch whose budget is checked before every search, or
+# None for no budget. Whenever the budget is exhausted None is generated 
+# instead of a path, with the graph unmodified, and the search carries on from
+# the same point once the generator is advanced again.
+#
+# @retval iter An iterator of the paths.
+#
+def _yen(graph, node_start, node_end, max_k, max_cost, trace, budget):
+    if _is_nodes(node_start) or _is_nodes(node_end):
+        graph = SuperGraph(graph, node_start, node_end)
+        if trace is not None:
+            trace = _SuperTrace(trace)
+        for path_k in _yen(graph, SuperGraph.SOURCE, SuperGraph.SINK, max_k, 
+                           max_cost, trace, budget):
+            yield path_k and Path(path_k.cost, path_k.nodes[1:-1])
+        return
+    
+    stats = budget and budget.stats
+    while budget and budget.exhausted():
+        yield None
+    
+    bounds = None
+    if max_cost is not None:
+        bounds = dijkstra(reverse(graph), node_end, None, None, None, None,
+                          stats)[0]
+    
+    path_first = dijkstra(graph, node_start, node_end, max_cost, None, bounds,
+                          stats)
+    if not path_first['path']:
+        return
+    
+    A = [Path(path_first['cost'], path_first['path'])]
     B = []
     
-    if not A[0]['path']: return A
+    # The paths currently in B, so that duplicates are found without a scan 
+    # of B. It holds no more paths than B does.
+    seen = set()
     
-    for k in range(1, max_k):
-        for i in range(0, len(A[-1]['path']) - 1):
-            node_spur = A[-1]['path'][i]
-            path_root = A[-1]['path'][:i+1]
+    if trace is not None:
+        trace.select(0, A[0])
+    yield A[0]
+    
+    k = 1
+    while max_k is None or k < max_k:
+        needed = max_k - len(A) if max_k is not None else None
+        cost_root = 0
+        
+        for i in range(0, len(A[-1].nodes) - 1):
+            node_spur = A[-1].nodes[i]
+            path_root = A[-1].nodes[:i+1]
+            if i > 0:
+                cost_root += graph[path_root[-2]][node_spur]
+            
+            cutoff = None
+            if max_cost is not None:
+                cutoff = max_cost - cost_root
+                if bounds[node_spur] > cutoff:
+                    continue
+            if needed is not None and len(B) >= needed:
+                cutoff_b = B[-1].cost - cost_root
+                if cutoff is None or cutoff_b < cutoff:
+                    cutoff = cutoff_b
+            
+            while budget and budget.exhausted():
+                yield None
             
             edges_removed = []
             for path_k in A:
-                curr_path = path_k['path']
+                curr_path = path_k.nodes
                 if len(curr_path) > i and path_root == curr_path[:i+1]:
                     cost = graph.remove_edge(curr_path[i], curr_path[i+1])
                     if cost == -1:
                         continue
                     edges_removed.append([curr_path[i], curr_path[i+1], cost])
             
-            path_spur = dijkstra(graph, node_spur, node_end)
+            path_spur = dijkstra(graph, node_spur, node_end, cutoff, 
+                                 set(path_root[:-1]), bounds, stats)
             
             if path_spur['path']:
-                path_total = path_root[:-1] + path_spur['path']
-                dist_total = distances[node_spur] + path_spur['cost']
-                potential_k = {'cost': dist_total, 'path': path_total}
+                path_total = path_root[:-1] + tuple(path_spur['path'])
+                dist_total = cost_root + path_spur['cost']
+                potential_k = Path(dist_total, path_total)
+                
+                if potential_k not in seen:
+                    _insert_bounded(B, potential_k, needed, seen)
             
-                if not (potential_k in B):
-                    B.append(potential_k)
+            if trace is not None:
+                trace.spur(k, node_spur, path_root, edges_removed, 
+                           path_spur if path_spur['path'] else None, B)
             
             for edge in edges_removed:
                 graph.add_edge(edge[0], edge[1], edge[2])
         
-        if len(B):
-            B = sorted(B, key=itemgetter('cost'))
-            A.append(B[0])
-            B.pop(0)
-        else:
+        if not len(B):
             break
+        
+        A.append(B.pop(0))
+        seen.discard(A[-1])
+        
+        if trace is not None:
+            trace.select(k, A[-1])
+        yield A[-1]
+        
+        k += 1
+
+## Inserts a potential path into a container sorted by cost, keeping at most
+# a bounded amount of paths. Paths of equal cost keep the order they were 
+# inserted in, so the worst path is always the last one.
+#
+# @param B List of paths sorted by cost.
+# @param potential_k The Path to be inserted.
+# @param max_size The maximum amount of paths B may hold, or None for no limit.
+# @param seen The set of the paths in B, updated along with it.
+#
+# @retval bool True if the path was inserted, False if it is no better than 
+# the paths already in a full container.
+#
+def _insert_bounded(B, potential_k, max_size, seen):
+    cost = potential_k.cost
+    if max_size is not None and len(B) >= max_size and cost >= B[-1].cost:
+        return False
     
-    return A
+    index = len(B)
+    while index > 0 and B[index - 1].cost > cost:
+        index -= 1
+    B.insert(index, potential_k)
+    seen.add(potential_k)
+    
+    if max_size is not None and len(B) > max_size:
+        seen.discard(B.pop())
+    
+    return True
 
-## Computes the shortest path from a source to a sink in the supplied graph.
+## Computes K disjoint paths from a source to a sink with the minimum total 
+# cost, using the successive shortest path method of Suurballe and Bhandari.
+# Each path is found with one run of dijkstra on the residual graph of the 
+# paths found so far, where the edges are weighted by their reduced cost with 
+# respect to node potentials, so that edges used in the reverse direction 
+# never have a negative weight. For node disjoint paths every node is split 
+# into an entry and exit node joined by a single edge.
+#
+# @param graph A digraph of class Graph.
+# @param node_start The source node of the graph, or a list or set of nodes.
+# @param node_end The sink node of the graph, or a list or set of nodes.
+# @param max_k The amount of paths being computed.
+# @param nodes True if the paths may not share any node other than the source 
+# and sink, False if they may only not share any edge.
+#
+# @retval [] Array of Path objects of the disjoint paths ordered by cost. Fewer
+# than max_k paths are returned if the graph does not contain max_k disjoint paths.
+#
+def ksp_disjoint(graph, node_start, node_end, max_k=2, nodes=False):
+    if _is_nodes(node_start) or _is_nodes(node_end):
+        endpoints = set(_nodes(node_start) + _nodes(node_end))
+        virtual = set([SuperGraph.SOURCE, SuperGraph.SINK])
+        A = _disjoint(SuperGraph(graph, node_start, node_end), 
+                      SuperGraph.SOURCE, SuperGraph.SINK, max_k, nodes, 
+                      endpoints | virtual, virtual)
+        
+        return [Path(path_k.cost, path_k.nodes[1:-1]) for path_k in A]
+    
+    return _disjoint(graph, node_start, node_end, max_k, nodes, 
+                     set([node_start, node_end]), set())
+
+## Computes the disjoint paths of ksp_disjoint.
 #
 # @param graph A digraph of class Graph.
 # @param node_start The source node of the graph.
 # @param node_end The sink node of the graph.
+# @param max_k The amount of paths being computed.
+# @param nodes True for node disjoint paths, False for edge disjoint paths.
+# @param endpoints The set of nodes that may be shared by node disjoint paths.
+# @param virtual The set of virtual nodes whose edges may be used by every 
+# path, rather than by a single path.
+#
+# @retval [] Array of the disjoint paths ordered by cost.
+#
+def _disjoint(graph, node_start, node_end, max_k, nodes, endpoints, virtual):
+    if nodes:
+        entry = lambda v: v if v in endpoints else (v, 0)
+        exit = lambda v: v if v in endpoints else (v, 1)
+    else:
+        entry = exit = lambda v: v
+    
+    # The flow network, and the graph node of every network node that is 
+    # part of a returned path, i.e. every node but the exit of a split node.
+    network = {}
+    original = {}
+    for v in graph:
+        original[entry(v)] = v
+        network.setdefault(entry(v), {})
+        network.setdefault(exit(v), {})
+        if entry(v) != exit(v):
+            network[entry(v)][exit(v)] = 0
+        
+        for u, cost in graph[v].iteritems():
+            if cost < graph.INFINITY:
+                network[exit(v)][entry(u)] = cost
+    
+    capacity = lambda v, u: max_k if v in virtual or u in virtual else 1
+    potentials = dict((v, 0) for v in network)
+    flow = {}
+    
+    for k in range(0, max_k):
+        # An edge used by a path can also be used in reverse, at the negative
+        # of its cost, which is never more than an edge in that direction.
+        residual = dict((v, {}) for v in network)
+        for v, edges in network.iteritems():
+            for u, cost in edges.iteritems():
+                arcs = []
+                if flow.get((v, u), 0) < capacity(v, u):
+                    arcs.append((v, u, cost))
+                if flow.get((v, u), 0) > 0:
+                    arcs.append((u, v, -cost))
+                
+                for node_from, node_to, cost in arcs:
+                    cost += potentials[node_from] - potentials[node_to]
+                    if cost < residual[node_from].get(node_to, graph.INFINITY):
+                        residual[node_from][node_to] = cost
+        
+        distances, previous = dijkstra(DataGraph(residual), node_start)
+        if distances[node_end] == graph.INFINITY:
+            break
+        
+        for v in network:
+            potentials[v] += min(distances[v], distances[node_end])
+        
+        route = path(previous, node_start, node_end)
+        for v, u in zip(route, route[1:]):
+            if flow.get((u, v), 0) > 0:
+                flow[(u, v)] -= 1
+            else:
+                flow[(v, u)] = flow.get((v, u), 0) + 1
+    
+    successors = {}
+    for (v, u), units in flow.iteritems():
+        successors.setdefault(v, []).extend([u] * units)
+    
+    A = []
+    while successors.get(node_start):
+        route = [node_start]
+        while route[-1] != node_end:
+            node_next = successors[route[-1]].pop()
+            if node_next in route:
+                route = route[:route.index(node_next)]
+            route.append(node_next)
+        
+        route = [original[v] for v in route if v in original]
+        A.append(Path(sum(graph[v][u] for v, u in zip(route, route[1:])),
+                      route))
+    
+    A.sort(key=lambda item: item.cost)
+    return A
+
+## Computes the shortest path from a source to a sink in the supplied graph.
+# The source and sink may each be a list or set of nodes, in which case the 
+# search starts from every source at once and ends at the first sink reached,
+# see SuperGraph for the sets that are accepted.
+#
+# @param graph A digraph of class Graph.
+# @param node_start The source node of the graph, or a list or set of nodes.
+# @param node_end The sink node of the graph, or a list or set of nodes.
+# @param cutoff The maximum cost of a path, the search stops once every node 
+# left has a greater distance. If node_end is not specified, the distances 
+# greater than the cutoff are not final.
+# @param nodes_excluded A set of nodes that paths may not pass through.
+# @param bounds Dictionary of a lower bound on the cost from each node to 
+# node_end. With a cutoff, a node is only reached if its distance plus its 
+# bound is within the cutoff.
+# @param stats Dictionary of the counters 'calls' and 'settled', which are 
+# increased by one and by the amount of nodes settled by the search.
 #
 # @retval {} Dictionary of path and cost or if the node_end is not specified,
-# the distances and previous lists are returned.
+# the distances and previous lists are returned. If no path within the cutoff
+# exist, the path is an empty list.
 #
-def dijkstra(graph, node_start, node_end=None):
+def dijkstra(graph, node_start, node_end=None, cutoff=None, 
+             nodes_excluded=None, bounds=None, stats=None):
+    if _is_nodes(node_start) or _is_nodes(node_end):
+        return _dijkstra_super(graph, node_start, node_end, cutoff, 
+                               nodes_excluded, bounds, stats)
+    
+    if stats is not None:
+        stats['calls'] += 1
+    
     distances = {}      
     previous = {}       
     Q = priorityDictionary()
     
-    for v in graph:
-        distances[v] = graph.INFINITY
-        previous[v] = graph.UNDEFINDED
-        Q[v] = graph.INFINITY
-    
+    # Nodes are only queued once they are reached, so a search that stops 
+    # early never touches the rest of the graph.
     distances[node_start] = 0
+    previous[node_start] = graph.UNDEFINDED
     Q[node_start] = 0
     
     for v in Q:
+        if stats is not None:
+            stats['settled'] += 1
+        if cutoff is not None and distances[v] > cutoff:
+            if node_end:
+                return {'cost': graph.INFINITY, 'path': []}
+            break
         if v == node_end: break
-
-        for u in graph[v]:
-            cost_vu = distances[v] + graph[v][u]
+        
+        for u, cost in graph[v].iteritems():
+            if nodes_excluded and u in nodes_excluded:
+                continue
             
-            if cost_vu < distances[u]:
+            cost_vu = distances[v] + cost
+            if bounds and cutoff is not None and \
+               cost_vu + bounds.get(u, graph.INFINITY) > cutoff:
+                continue
+            
+            if cost_vu < distances.get(u, graph.INFINITY):
                 distances[u] = cost_vu
                 Q[u] = cost_vu
                 previous[u] = v
-
+    
     if node_end:
+        if not distances.has_key(node_end):
+            return {'cost': graph.INFINITY, 'path': []}
+        
         return {'cost': distances[node_end], 
                 'path': path(previous, node_start, node_end)}
     else:
+        for v in graph:
+            if not distances.has_key(v):
+                distances[v] = graph.INFINITY
+                previous[v] = graph.UNDEFINDED
+        
         return (distances, previous)
 
+## Runs dijkstra from a set of sources to a set of sinks through the virtual
+# nodes of a SuperGraph, and removes the virtual nodes from the result.
+#
+# @retval {} See dijkstra.
+#
+def _dijkstra_super(graph, node_start, node_end, cutoff, nodes_excluded, 
+                    bounds, stats):
+    graph = SuperGraph(graph, node_start, node_end)
+    
+    if node_end is not None:
+        result = dijkstra(graph, SuperGraph.SOURCE, SuperGraph.SINK, cutoff,
+                          nodes_excluded, bounds, stats)
+        
+        return {'cost': result['cost'], 'path': result['path'][1:-1]}
+    
+    distances, previous = dijkstra(graph, SuperGraph.SOURCE, None, cutoff,
+                                   nodes_excluded, bounds, stats)
+    for node in (SuperGraph.SOURCE, SuperGraph.SINK):
+        del distances[node]
+        del previous[node]
+    for v, u in previous.iteritems():
+        if u is SuperGraph.SOURCE:
+            previous[v] = DiGraph.UNDEFINDED
+    
+    return (distances, previous)
+
+## Builds the reverse of the supplied graph, where every edge points the 
+# other way. Removed edges, i.e. edges of infinite cost, are left out.
+#
+# @param graph A digraph of class Graph.
+#
+# @retval DataGraph A graph with the same nodes and every edge reversed.
+#
+def reverse(graph):
+    data = dict((v, {}) for v in graph)
+    for v in graph:
+        for u, cost in graph[v].iteritems():
+            if cost < graph.INFINITY:
+                data[u][v] = cost
+    
+    return DataGraph(data)
+
 ## Finds a paths from a source to a sink using a supplied previous node list.
 #
 # @param previous A list of node predecessors.
-# @param node_start The source node of the graph.
+# @param node_start The source node of the graph, or a list or set of nodes.
 # @param node_end The sink node of the graph.
 #
 # @retval [] Array of nodes if a path is found, an empty list if no path is 
 # found from the source to sink.
 #
 def path(previous, node_start, node_end):
+    if _is_nodes(node_start):
+        route = [node_end]
+        while previous.get(route[-1]) != DiGraph.UNDEFINDED:
+            route.append(previous[route[-1]])
+        
+        if route[-1] not in node_start:
+            return []
+        
+        route.reverse()
+        return route
+    
     route = []
 
     node_curr = node_end    
@@ -153,3 +499,536 @@ def path(previous, node_start, node_end):
     
     route.reverse()
     return route
+
+
+## @brief An anytime run of ksp_yen, which stops once a budget is spent and 
+# can be resumed later.
+#
+# Each call to run searches for more paths until max_k paths are found or one
+# of its budgets is exhausted: a timeout in seconds, an amount of dijkstra 
+# searches, or an amount of nodes settled by those searches. The budgets are 
+# checked before every dijkstra search, in the k loop and the spur loop. The 
+# paths found so far are returned with a flag of whether the result is 
+# complete, and the next call to run carries on from where the last one 
+# stopped, with a fresh budget. The graph must not be modified in between.
+#
+#     search = YenSearch(graph, "C", "H", 30)
+#     paths, complete = search.run(timeout=0.05)
+class YenSearch:
+    ## The amount of paths being computed.
+    _max_k = None
+    
+    ## The generator of _yen holding the state of the search.
+    _paths = None
+    
+    ## The list of paths found so far.
+    _found = None
+    
+    ## Whether every path has been found.
+    _complete = False
+    
+    ## The time after which the budget is exhausted, or None.
+    _deadline = None
+    
+    ## The value of each counter of stats after which the budget is exhausted.
+    _limits = None
+    
+    ## Dictionary of the counters 'calls' and 'settled' of all searches so far,
+    # see dijkstra.
+    stats = None
+    
+    ## Initializes the search, nothing is searched until run is called.
+    #
+    # @param self The object pointer.
+    # @param graph A digraph of class Graph.
+    # @param node_start The source node of the graph, or a list or set of nodes.
+    # @param node_end The sink node of the graph, or a list or set of nodes.
+    # @param max_k The amount of paths being computed.
+    # @param trace A tracer.YenTrace that records every step of the algorithm, 
+    # if not specified nothing is recorded.
+    #
+    def __init__(self, graph, node_start, node_end, max_k=2, trace=None):
+        self._max_k = max_k
+        self._found = []
+        self._limits = {}
+        self.stats = {'calls': 0, 'settled': 0}
+        self._paths = _yen(graph, node_start, node_end, max_k, None, trace, 
+                           self)
+        
+        return
+    
+    ## Searches for more paths until every path is found or a budget is spent.
+    #
+    # @param self The object pointer.
+    # @param timeout The maximum amount of seconds spent in this call.
+    # @param max_calls The maximum amount of dijkstra searches in this call.
+    # @param max_settled The maximum amount of nodes settled in this call.
+    # @retval () The list of paths found so far, as returned by ksp_yen, and 
+    # True if it holds every path, or False if the budget ran out first.
+    #
+    def run(self, timeout=None, max_calls=None, max_settled=None):
+        self._deadline = time.time() + timeout if timeout is not None \
+                         else None
+        self._limits = {}
+        if max_calls is not None:
+            self._limits['calls'] = self.stats['calls'] + max_calls
+        if max_settled is not None:
+            self._limits['settled'] = self.stats['settled'] + max_settled
+        
+        while not self._complete:
+            path_k = next(self._paths, False)
+            if path_k is None:
+                break
+            elif path_k is False:
+                self._complete = True
+            else:
+                self._found.append(path_k)
+                self._complete = len(self._found) >= self._max_k
+        
+        if self._complete and not self._found:
+            return ([Path(DiGraph.INFINITY, ())], True)
+        
+        return (list(self._found), self._complete)
+    
+    ## Determines whether the budget of the current call to run is spent.
+    #
+    # @param self The object pointer.
+    # @retval bool True if the search should stop.
+    #
+    def exhausted(self):
+        if self._deadline is not None and time.time() >= self._deadline:
+            return True
+        
+        for counter, limit in self._limits.iteritems():
+            if self.stats[counter] >= limit:
+                return True
+        
+        return False
+
+
+## @brief An immutable path and its cost, as returned by ksp_yen.
+#
+# A path is a slotted object of its cost, a tuple of its nodes and the hash of
+# both, so a candidate path costs far less than a dictionary and list, and 
+# comparing or hashing paths is cheap. For compatibility with the 
+# dictionaries returned by dijkstra, path['cost'] and path['path'] still work,
+# where path['path'] is a new list of the nodes, and dict(path) converts it 
+# back into a dictionary. The algorithms themselves use cost and nodes.
+class Path(object):
+    __slots__ = ('cost', 'nodes', '_hash')
+    
+    ## Initializes the path.
+    #
+    # @param self The object pointer.
+    # @param cost The cost of the path.
+    # @param nodes Sequence of the nodes of the path.
+    #
+    def __init__(self, cost, nodes):
+        self.cost = cost
+        self.nodes = tuple(nodes)
+        self._hash = hash((cost, self.nodes))
+        
+        return
+    
+    ## Gets the cost or nodes of the path by their dictionary key.
+    #
+    # @param self The object pointer.
+    # @param key Either 'cost' or 'path'.
+    # @retval The cost, or the list of nodes.
+    #
+    def __getitem__(self, key):
+        if key == 'cost':
+            return self.cost
+        elif key == 'path':
+            return list(self.nodes)
+        
+        raise KeyError(key)
+    
+    ## Gets the cost or nodes of the path, see dict.get.
+    #
+    # @param self The object pointer.
+    # @param key Either 'cost' or 'path'.
+    # @param default The value returned for any other key.
+    # @retval The cost, the list of nodes, or the default.
+    #
+    def get(self, key, default=None):
+        if key == 'cost' or key == 'path':
+            return self[key]
+        
+        return default
+    
+    ## The dictionary keys of the path.
+    #
+    # @param self The object pointer.
+    # @retval [] The list of keys.
+    #
+    def keys(self):
+        return ['cost', 'path']
+    
+    ## Converts the path into the dictionary format returned by dijkstra.
+    #
+    # @param self The object pointer.
+    # @retval {} Dictionary of the cost and the list of nodes.
+    #
+    def to_dict(self):
+        return {'cost': self.cost, 'path': self['path']}
+    
+    ## The hash of the path, computed once.
+    #
+    # @param self The object pointer.
+    # @retval int The hash of the cost and nodes.
+    #
+    def __hash__(self):
+        return self._hash
+    
+    ## Compares the path to another Path, or to a dictionary of dijkstra.
+    #
+    # @param self The object pointer.
+    # @param other The path compared to.
+    # @retval bool True if the cost and nodes are equal.
+    #
+    def __eq__(self, other):
+        if isinstance(other, Path):
+            return self._hash == other._hash and self.cost == other.cost \
+                   and self.nodes == other.nodes
+        elif isinstance(other, dict):
+            return self.to_dict() == other
+        
+        return NotImplemented
+    
+    ## The negation of __eq__.
+    #
+    # @param self The object pointer.
+    # @param other The path compared to.
+    # @retval bool True if the cost or nodes differ.
+    #
+    def __ne__(self, other):
+        equal = self.__eq__(other)
+        if equal is NotImplemented:
+            return equal
+        
+        return not equal
+    
+    ## Orders paths by cost, then by their nodes.
+    #
+    # @param self The object pointer.
+    # @param other The path compared to.
+    # @retval bool True if the path is ordered before the other path.
+    #
+    def __lt__(self, other):
+        return (self.cost, self.nodes) < (other.cost, other.nodes)
+    
+    ## The representation of the path.
+    #
+    # @param self The object pointer.
+    # @retval "" The cost and the list of nodes.
+    #
+    def __repr__(self):
+        return "Path(%r, %r)" % (self.cost, list(self.nodes))
+
+
+## @brief Wraps a dictionary of nodes and edges with the graph interface used 
+# by the algorithms.
+#
+# The dictionary has the same layout as DiGraph._data. It is used for graphs 
+# derived by the algorithms themselves, which are never stored or painted.
+class DataGraph:
+    ## An edge with this cost signifies that it has been removed from the graph.
+    INFINITY = DiGraph.INFINITY
+    
+    ## Represents a NULL predecessor.
+    UNDEFINDED = DiGraph.UNDEFINDED
+    
+    ## The dictionary of the graph.
+    _data = None
+    
+    ## Initializes the graph with a dictionary of nodes and edges.
+    #
+    # @param self The object pointer.
+    # @param data Dictionary of nodes, where each value is a dictionary of 
+    # edges and their cost.
+    #
+    def __init__(self, data):
+        self._data = data
+        
+        return
+    
+    ## Gets the edges of a specified node.
+    #
+    # @param self The object pointer.
+    # @param node The node whose edges are being queried.
+    # @retval {} A dictionary of the edges and thier cost if the node exist 
+    # within the graph or None if the node is not in the graph.
+    #
+    def __getitem__(self, node):
+        return self._data.get(node)
+    
+    ## Iterator for the graph object.
+    #
+    # @param self The object pointer.
+    # @retval iter An iterator over the nodes of the graph.
+    #
+    def __iter__(self):
+        return iter(self._data)
+
+
+## @brief A virtual node added to a graph by SuperGraph.
+class _VirtualNode:
+    ## The name of the node.
+    _name = None
+    
+    ## Initializes the node with a name.
+    #
+    # @param self The object pointer.
+    # @param name The name of the node.
+    #
+    def __init__(self, name):
+        self._name = name
+        
+        return
+    
+    ## The printable representation of the node.
+    #
+    # @param self The object pointer.
+    # @retval "" The name of the node.
+    #
+    def __repr__(self):
+        return self._name
+
+    ## The hash of the node, derived from its name so that the order of sets
+    # and dictionaries holding it does not change between runs.
+    #
+    # @param self The object pointer.
+    # @retval int The hash value.
+    #
+    def __hash__(self):
+        return hash(("_VirtualNode", self._name))
+
+    ## Compares two virtual nodes by name. A virtual node is never equal to a
+    # node of the graph, even one with the same name.
+    #
+    # @param self The object pointer.
+    # @param other The object compared to.
+    # @retval bool True if other is a virtual node with the same name.
+    #
+    def __eq__(self, other):
+        return isinstance(other, _VirtualNode) and self._name == other._name
+
+    ## Compares two virtual nodes by name.
+    #
+    # @param self The object pointer.
+    # @param other The object compared to.
+    # @retval bool True if other is not a virtual node with the same name.
+    #
+    def __ne__(self, other):
+        return not self.__eq__(other)
+
+## @brief Adds a virtual super source and super sink to a graph without 
+# modifying it.
+#
+# The super source has an edge of cost zero to every source and every sink has
+# an edge of cost zero to the super sink, so a search from SOURCE to SINK is a 
+# search from any of the sources to any of the sinks. The virtual edges are 
+# removed and added back within the view, every other edge is passed on to the
+# wrapped graph.
+#
+# The sources and sinks may not share a node. Such a node would be a path of a
+# single node from SOURCE to SINK at cost zero, while a search from a node to 
+# itself finds no path, so a ValueError is raised instead.
+class SuperGraph:
+    ## An edge with this cost signifies that it has been removed from the graph.
+    INFINITY = DiGraph.INFINITY
+    
+    ## Represents a NULL predecessor.
+    UNDEFINDED = DiGraph.UNDEFINDED
+    
+    ## The virtual node that has an edge to every source.
+    SOURCE = _VirtualNode("SOURCE")
+    
+    ## The virtual node that every sink has an edge to.
+    SINK = _VirtualNode("SINK")
+    
+    ## The wrapped graph.
+    _graph = None
+    
+    ## Dictionary of the edges of SOURCE, from each source to its cost.
+    _edges_source = None
+    
+    ## Dictionary of the cost of the edge from each sink to SINK.
+    _edges_sink = None
+    
+    ## Initializes the view with the graph, sources and sinks.
+    #
+    # @param self The object pointer.
+    # @param graph A digraph of class Graph.
+    # @param sources A node or a list or set of nodes.
+    # @param sinks A node or a list or set of nodes, or None for no sinks.
+    #
+    def __init__(self, graph, sources, sinks):
+        self._graph = graph
+        self._edges_source = dict((v, 0) for v in _nodes(sources))
+        self._edges_sink = dict((v, 0) for v in _nodes(sinks))
+        
+        shared = [v for v in self._edges_source if self._edges_sink.has_key(v)]
+        if shared:
+            raise ValueError("the sources and sinks share %s" % 
+                             ", ".join(sorted(repr(v) for v in shared)))
+        
+        return
+    
+    ## Gets the edges of a specified node.
+    #
+    # @param self The object pointer.
+    # @param node The node whose edges are being queried.
+    # @retval {} A dictionary of the edges and thier cost if the node exist 
+    # within the graph or None if the node is not in the graph.
+    #
+    def __getitem__(self, node):
+        if node is self.SOURCE:
+            return self._edges_source
+        elif node is self.SINK:
+            return {}
+        
+        edges = self._graph[node]
+        if edges is not None and self._edges_sink.has_key(node):
+            edges = dict(edges)
+            edges[self.SINK] = self._edges_sink[node]
+        
+        return edges
+    
+    ## Iterator for the graph object.
+    #
+    # @param self The object pointer.
+    # @retval iter An iterator over the nodes of the graph and the virtual 
+    # nodes.
+    #
+    def __iter__(self):
+        for node in self._graph:
+            yield node
+        yield self.SOURCE
+        yield self.SINK
+    
+    ## Removes an edge from the graph, see DiGraph.remove_edge.
+    #
+    # @param self The object pointer.
+    # @param node_from The node that the edge starts at.
+    # @param node_to The node that the edge terminates at.
+    # @param cost The cost of the edge.
+    # @retval int The cost of the edge that was removed, or -1.
+    #
+    def remove_edge(self, node_from, node_to, cost=None):
+        if node_from is self.SOURCE:
+            edges, node = self._edges_source, node_to
+        elif node_to is self.SINK:
+            edges, node = self._edges_sink, node_from
+        else:
+            return self._graph.remove_edge(node_from, node_to, cost)
+        
+        if edges.get(node, self.INFINITY) == self.INFINITY:
+            return -1
+        
+        cost = edges[node]
+        edges[node] = self.INFINITY
+        return cost
+    
+    ## Adds an edge to the graph, see DiGraph.add_edge.
+    #
+    # @param self The object pointer.
+    # @param node_from The node that the edge starts at.
+    # @param node_to The node that the edge terminates at.
+    # @param cost The cost of the edge.
+    #
+    def add_edge(self, node_from, node_to, cost=None):
+        if node_from is self.SOURCE:
+            self._edges_source[node_to] = cost
+        elif node_to is self.SINK:
+            self._edges_sink[node_from] = cost
+        else:
+            self._graph.add_edge(node_from, node_to, cost)
+        
+        return
+
+## @brief Records the steps of ksp_yen on a SuperGraph into a trace without 
+# the virtual nodes.
+#
+# Every path, root path and removed edge is recorded as it is in the graph, so
+# the trace can be saved and replayed like any other. A spur step at SOURCE, 
+# i.e. at the start of a path, is recorded with None as its spur node.
+class _SuperTrace:
+    ## The wrapped trace.
+    _trace = None
+    
+    ## Initializes the view with the trace.
+    #
+    # @param self The object pointer.
+    # @param trace A tracer.YenTrace.
+    #
+    def __init__(self, trace):
+        self._trace = trace
+        
+        return
+    
+    ## Records a spur step, see YenTrace.spur.
+    #
+    # @param self The object pointer.
+    #
+    def spur(self, k, node_spur, path_root, edges_removed, path_spur, 
+             container_b):
+        if isinstance(node_spur, _VirtualNode):
+            node_spur = None
+        if path_spur:
+            path_spur = {'cost': path_spur['cost'], 
+                         'path': _real(path_spur['path'])}
+        
+        self._trace.spur(k, node_spur, _real(path_root), 
+                         [edge for edge in edges_removed
+                          if not isinstance(edge[0], _VirtualNode) and 
+                             not isinstance(edge[1], _VirtualNode)], 
+                         path_spur, 
+                         [{'cost': item['cost'], 'path': _real(item['path'])}
+                          for item in container_b])
+        
+        return
+    
+    ## Records a path chosen as A^k, see YenTrace.select.
+    #
+    # @param self The object pointer.
+    #
+    def select(self, k, path_k):
+        self._trace.select(k, {'cost': path_k['cost'], 
+                               'path': _real(path_k['path'])})
+        
+        return
+
+## Removes the virtual nodes of a SuperGraph from a path.
+#
+# @param route The list of nodes.
+#
+# @retval [] The nodes of the path that are in the graph.
+#
+def _real(route):
+    return [v for v in route if not isinstance(v, _VirtualNode)]
+
+## Determines whether a source or sink argument is a collection of nodes. A 
+# tuple is a single node, since node names may be tuples.
+#
+# @param node A node, or a list or set of nodes.
+#
+# @retval bool True if the argument is a collection of nodes.
+#
+def _is_nodes(node):
+    return isinstance(node, (list, set, frozenset))
+
+## Converts a source or sink argument into a list of nodes.
+#
+# @param node A node, a list or set of nodes, or None.
+#
+# @retval [] The list of nodes.
+#
+def _nodes(node):
+    if node is None:
+        return []
+    elif _is_nodes(node):
+        return list(node)
+    
+    return [node]
@@ -0,0 +1,333 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+#  apsp.py
+#
+#  Copyright 2012 Kevin R <KRPent@gmail.com>
+#
+#  This program is free software; you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation; either version 2 of the License, or
+#  (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software
+#  Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston,
+#  MA 02110-1301, USA.
+#
+#
+import os
+import json
+import hashlib
+import algorithms
+from graph import DiGraph
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
+## @brief Distance and next hop tables between every pair of nodes of a graph.
+#
+# With numpy the tables are computed with a vectorized Floyd-Warshall over the
+# adjacency matrix of the graph, updating a block of rows at a time so that no
+# temporary array is larger than the block. Without numpy the tables are built
+# from one run of dijkstra per node. Either way, a path is reconstructed by
+# following the next hop table, in time linear to the length of the path.
+#
+# The tables can be stored in the "data/apsp/" folder next to the graph data,
+# together with a fingerprint of the edges they were computed from.
+class AllPairs:
+    ## The location that the tables are stored.
+    _directory_data = "data/apsp/"
+
+    ## The amount of rows of the distance matrix updated at once.
+    _block_rows = 256
+
+    ## An edge with this cost signifies that it has been removed from the graph.
+    INFINITY = DiGraph.INFINITY
+
+    ## The list of node names, where the position of a name is its index.
+    _names = None
+
+    ## Dictionary of node names to their index.
+    _index = None
+
+    ## Matrix of the distance from the node of each row to the node of each
+    # column, where unreachable nodes have a distance of INFINITY.
+    _dist = None
+
+    ## Matrix of the index of the node after the node of each row on the
+    # shortest path to the node of each column, or -1 if there is no path.
+    _next = None
+
+    ## The fingerprint of the edges the tables were computed from.
+    _fingerprint = None
+
+    ## Initializes the tables, computed from a graph if one is supplied.
+    #
+    # @param self The object pointer.
+    # @param graph A digraph of class Graph, or any graph with the same
+    # interface, if not specified the tables are empty until loaded.
+    #
+    def __init__(self, graph=None):
+        if graph is not None:
+            self.compute(graph)
+
+        return
+
+    ## Computes the tables of a graph.
+    #
+    # @post The distance and next hop tables will hold every pair of nodes of
+    # the graph.
+    #
+    # @param self The object pointer.
+    # @param graph A digraph of class Graph, or any graph with the same
+    # interface.
+    #
+    def compute(self, graph):
+        self._names = list(graph)
+        self._index = dict((name, i) for i, name in enumerate(self._names))
+        self._fingerprint = fingerprint(graph)
+
+        if numpy is not None:
+            self._floyd_warshall(graph)
+        else:
+            self._dijkstra(graph)
+
+        return
+
+    ## Computes the tables with a vectorized Floyd-Warshall.
+    #
+    # @param self The object pointer.
+    # @param graph The graph whose tables are computed.
+    #
+    def _floyd_warshall(self, graph):
+        size = len(self._names)
+        dist = numpy.full((size, size), numpy.inf)
+        hops = numpy.full((size, size), -1, dtype=numpy.int32)
+
+        for i, name in enumerate(self._names):
+            for node_to, cost in graph[name].iteritems():
+                j = self._index[node_to]
+                if cost < self.INFINITY and cost < dist[i, j]:
+                    dist[i, j] = cost
+                    hops[i, j] = j
+        numpy.fill_diagonal(dist, 0)
+        hops[numpy.arange(size), numpy.arange(size)] = numpy.arange(size)
+
+        # Paths through node k only change rows other than k and columns
+        # other than k, so rows can be updated in place one block at a time.
+        for k in xrange(size):
+            dist_k = dist[k]
+            for start in xrange(0, size, self._block_rows):
+                rows = slice(start, start + self._block_rows)
+                through = dist[rows, k, None] + dist_k
+                better = through < dist[rows]
+                if better.any():
+                    dist[rows] = numpy.where(better, through, dist[rows])
+                    hops[rows] = numpy.where(better, hops[rows, k, None],
+                                             hops[rows])
+
+        dist[numpy.isinf(dist)] = self.INFINITY
+        self._dist = dist
+        self._next = hops
+
+        return
+
+    ## Computes the tables with one run of dijkstra per node.
+    #
+    # @param self The object pointer.
+    # @param graph The graph whose tables are computed.
+    #
+    def _dijkstra(self, graph):
+        self._dist = []
+        self._next = []
+
+        for name in self._names:
+            distances, previous = algorithms.dijkstra(graph, name)
+
+            # The next hop to a node is the next hop to its predecessor,
+            # which is shared by every node along the same branch.
+            hops = {name: name}
+            for node in self._names:
+                branch = []
+                while not hops.has_key(node):
+                    if previous[node] == name:
+                        hops[node] = node
+                    elif previous[node] == DiGraph.UNDEFINDED:
+                        hops[node] = None
+                    else:
+                        branch.append(node)
+                        node = previous[node]
+                for other in branch:
+                    hops[other] = hops[node]
+
+            self._dist.append([distances[node] for node in self._names])
+            self._next.append([self._index.get(hops[node], -1)
+                               for node in self._names])
+
+        return
+
+    ## The cost of the shortest path between two nodes.
+    #
+    # @param self The object pointer.
+    # @param node_start The source node.
+    # @param node_end The sink node.
+    # @retval int The cost of the path, INFINITY if no path exist.
+    #
+    def distance(self, node_start, node_end):
+        return _value(self._dist[self._index[node_start]]
+                      [self._index[node_end]])
+
+    ## The distances from a source to every node.
+    #
+    # @param self The object pointer.
+    # @param node_start The source node.
+    # @retval {} Dictionary of nodes to their distance, see dijkstra.
+    #
+    def distances(self, node_start):
+        row = self._dist[self._index[node_start]]
+
+        return dict((name, _value(row[i])) for i, name in
+                    enumerate(self._names))
+
+    ## The shortest path between two nodes, found by following the next hops.
+    #
+    # @param self The object pointer.
+    # @param node_start The source node.
+    # @param node_end The sink node.
+    # @retval {} Dictionary of path and cost, as returned by dijkstra.
+    #
+    def path(self, node_start, node_end):
+        i = self._index[node_start]
+        j = self._index[node_end]
+        if i == j or self._next[i][j] < 0:
+            return {'cost': self.distance(node_start, node_end), 'path': []}
+
+        route = [node_start]
+        while i != j:
+            i = int(self._next[i][j])
+            route.append(self._names[i])
+
+        return {'cost': self.distance(node_start, node_end), 'path': route}
+
+    ## Determines whether the tables were computed from the supplied graph.
+    #
+    # @param self The object pointer.
+    # @param graph A digraph of class Graph.
+    # @retval bool True if the graph has the same edges the tables were
+    # computed from.
+    #
+    def matches(self, graph):
+        return self._fingerprint == fingerprint(graph)
+
+    ## Stores the tables of the graph.
+    #
+    # @post There exist a ".npz" file with numpy, or a ".json" file without, at
+    # the directory specified by _directory_data.
+    #
+    # @param self The object pointer.
+    # @param name The identifier of the graph.
+    #
+    def save(self, name):
+        if not os.path.exists(self._directory_data):
+            os.mkdir(self._directory_data)
+
+        if numpy is not None:
+            numpy.savez("%s%s.npz" % (self._directory_data, name),
+                        names=numpy.array(json.dumps(self._names)),
+                        fingerprint=numpy.array(self._fingerprint),
+                        dist=self._dist, next=self._next)
+            return
+
+        fhandle = open("%s%s.json" % (self._directory_data, name), 'w')
+        fhandle.write(json.dumps({'names': self._names,
+                                  'fingerprint': self._fingerprint,
+                                  'dist': self._dist, 'next': self._next}))
+        fhandle.close()
+
+        return
+
+    ## Populates the tables with the stored tables of a graph.
+    #
+    # @param self The object pointer.
+    # @param name The identifier of the graph.
+    # @retval bool True if the tables were loaded, False if no tables are
+    # stored for the graph.
+    #
+    def load(self, name):
+        path_npz = "%s%s.npz" % (self._directory_data, name)
+        path_json = "%s%s.json" % (self._directory_data, name)
+
+        if numpy is not None and os.path.exists(path_npz):
+            stored = numpy.load(path_npz)
+            self._names = json.loads(stored['names'].item())
+            self._fingerprint = stored['fingerprint'].item()
+            self._dist = stored['dist']
+            self._next = stored['next']
+        elif os.path.exists(path_json):
+            fhandle = open(path_json, 'r')
+            stored = json.loads(fhandle.read())
+            fhandle.close()
+
+            self._names = stored['names']
+            self._fingerprint = stored['fingerprint']
+            self._dist = stored['dist']
+            self._next = stored['next']
+        else:
+            return False
+
+        self._index = dict((name, i) for i, name in enumerate(self._names))
+        return True
+
+
+## Gets the tables of a graph, loading them from disk if they were stored for
+# the same edges, and computing and storing them otherwise.
+#
+# @param graph A digraph of class Graph.
+# @param name The identifier the tables are stored as.
+#
+# @retval AllPairs The tables of the graph.
+#
+def all_pairs(graph, name):
+    tables = AllPairs()
+    if tables.load(name) and tables.matches(graph):
+        return tables
+
+    tables.compute(graph)
+    tables.save(name)
+
+    return tables
+
+## Computes a fingerprint of the nodes and edges of a graph.
+#
+# @param graph A digraph of class Graph, or any graph with the same interface.
+#
+# @retval "" The hex digest of the sorted nodes and edges.
+#
+def fingerprint(graph):
+    digest = hashlib.sha1()
+    for node in sorted(graph):
+        digest.update(json.dumps([node, sorted(graph[node].iteritems())]))
+
+    return digest.hexdigest()
+
+## Converts a distance of the tables into a python value.
+#
+# @param value A distance from a numpy matrix or a list.
+#
+# @retval The distance, as an int if it is integral.
+#
+def _value(value):
+    value = float(value)
+    if value.is_integer():
+        return int(value)
+
+    return value
@@ -0,0 +1,304 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+#  batch.py
+#
+#  Copyright 2012 Kevin R <KRPent@gmail.com>
+#
+#  This program is free software; you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation; either version 2 of the License, or
+#  (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software
+#  Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston,
+#  MA 02110-1301, USA.
+#
+#
+import os
+import sys
+import json
+import time
+import Queue
+import select
+import argparse
+import threading
+import multiprocessing
+import algorithms
+import compact
+import sharedgraph
+from graph import DiGraph
+
+
+## @package batch
+# Answers K-shortest path queries in bulk from the command line.
+#
+# The graph is loaded once by name, then every line of the input is a JSON
+# query and every line of the output is its JSON result, in the same order:
+#
+#     {"source": "C", "sink": "H", "k": 3}
+#     {"source": "C", "sink": "H", "k": 3, "paths": [{"cost": 5, ...}, ...]}
+#
+# A query can also be a list of the source, the sink and optionally K. Any
+# other fields of a query object, e.g. an "id", are copied into its result. A
+# query that can not be answered gets an "error" field instead of "paths", and
+# a "query" field with its line.
+#
+# Lines are read, solved and written a chunk at a time, so the memory used does
+# not grow with the amount of queries. A chunk is cut short when no further
+# line arrives within _chunk_wait seconds, so queries that are piped in slowly
+# are answered as they come. With more than one worker the graph is shared with
+# the worker processes through sharedgraph. Nothing is painted.
+#
+# usage: batch.py [-h] [-k K] [-w WORKERS] [-t] [-o OUTPUT] graph [queries]
+
+## The amount of lines sent to a worker at once.
+_chunk_lines = 64
+
+## The seconds a chunk waits for more lines before it is solved as it is.
+_chunk_wait = 0.1
+
+## The graph queries are answered on, set in each process.
+_graph = None
+
+## K of queries that do not specify it.
+_default_k = 1
+
+## Whether results hold the time taken by each query.
+_timing = False
+
+## Parses the arguments and answers every query of the input.
+#
+# @param argv The command line arguments, if not specified sys.argv is used.
+#
+# @retval int The exit status.
+#
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Computes the K-shortest "
+                                     "paths of JSON line queries.")
+    parser.add_argument("graph", help="the identifier of the graph in "
+                        "data/json/")
+    parser.add_argument("queries", nargs="?", default="-",
+                        help="the file of queries, stdin if not specified")
+    parser.add_argument("-k", type=int, default=1,
+                        help="K of queries that do not specify it")
+    parser.add_argument("-w", "--workers", type=int, default=1,
+                        help="the amount of worker processes")
+    parser.add_argument("-t", "--timing", action="store_true",
+                        help="add the seconds taken to each result")
+    parser.add_argument("-o", "--output", default="-",
+                        help="the file of results, stdout if not specified")
+    args = parser.parse_args(argv)
+    if args.k < 1:
+        parser.error("K must be at least 1")
+
+    graph = DiGraph(args.graph)
+    if not list(graph):
+        parser.error("no data for graph %s" % args.graph)
+
+    queries = sys.stdin if args.queries == "-" else open(args.queries, 'r')
+    results = sys.stdout if args.output == "-" else open(args.output, 'w')
+
+    if args.workers > 1:
+        name = "batch-%d" % os.getpid()
+        shared = sharedgraph.publish(compact.from_digraph(graph), name)
+        try:
+            _run_pool(name, queries, results, args.workers, args.k,
+                      args.timing)
+        finally:
+            shared.unlink()
+            shared.close()
+    else:
+        _init(graph, args.k, args.timing)
+        for chunk in _chunks(queries):
+            results.write(_solve_chunk(chunk))
+            results.flush()
+
+    if queries is not sys.stdin:
+        queries.close()
+    if results is not sys.stdout:
+        results.close()
+
+    return 0
+
+## Answers the queries with a pool of workers, keeping a bounded amount of
+# chunks in flight. The results are written by a separate thread as soon as
+# they are in order, so they do not wait for the next line of input.
+#
+# @param name The name of the shared graph.
+# @param queries The file of queries.
+# @param results The file of results.
+# @param workers The amount of worker processes.
+# @param k K of queries that do not specify it.
+# @param timing Whether results hold the time taken by each query.
+#
+def _run_pool(name, queries, results, workers, k, timing):
+    pool = multiprocessing.Pool(workers, _init_worker, (name, k, timing))
+    pending = Queue.Queue(2 * workers)
+    errors = []
+    writer = threading.Thread(target=_write_results,
+                              args=(pending, results, errors))
+    writer.daemon = True
+    writer.start()
+
+    try:
+        for chunk in _chunks(queries):
+            pending.put(pool.apply_async(_solve_chunk, (chunk,)))
+            if errors:
+                break
+
+        pending.put(None)
+        writer.join()
+    finally:
+        pool.terminate()
+        pool.join()
+
+    if errors:
+        raise errors[0]
+
+    return
+
+## Writes the results of the chunks in flight in order, until None is queued.
+#
+# @param pending The queue of the AsyncResult of every chunk.
+# @param results The file of results.
+# @param errors The list the first error of a chunk is added to, after which
+# the remaining chunks are only drained.
+#
+def _write_results(pending, results, errors):
+    for chunk in iter(pending.get, None):
+        if errors:
+            continue
+        try:
+            results.write(chunk.get())
+            results.flush()
+        except Exception, error:
+            errors.append(error)
+
+    return
+
+## Splits the lines of a file into lists of at most _chunk_lines lines. A
+# chunk ends early once no line is ready within _chunk_wait seconds of its
+# first line.
+#
+# @param queries The file of queries.
+#
+# @retval iter An iterator over the lists of lines.
+#
+def _chunks(queries):
+    while True:
+        line = queries.readline()
+        if not line:
+            return
+
+        chunk = [line]
+        started = time.time()
+        while len(chunk) < _chunk_lines and _ready(queries, started +
+                                                   _chunk_wait):
+            line = queries.readline()
+            if not line:
+                break
+            chunk.append(line)
+
+        yield chunk
+        if not line:
+            return
+
+## Determines whether a line can be read from a file before a deadline.
+#
+# @param queries The file of queries.
+# @param deadline The time the line must be ready by.
+#
+# @retval bool True if the file has input ready or can not be waited on.
+#
+def _ready(queries, deadline):
+    try:
+        fileno = queries.fileno()
+    except (AttributeError, ValueError):
+        return True
+
+    ready = select.select([fileno], [], [], max(deadline - time.time(), 0))
+    return bool(ready[0])
+
+## Sets the graph and options queries are answered with.
+#
+# @param graph The graph.
+# @param k K of queries that do not specify it.
+# @param timing Whether results hold the time taken by each query.
+#
+def _init(graph, k, timing):
+    global _graph, _timing, _default_k
+
+    _graph = graph
+    _default_k = k
+    _timing = timing
+
+    return
+
+## Attaches a worker process to the shared graph.
+#
+# @param name The name of the shared graph.
+# @param k K of queries that do not specify it.
+# @param timing Whether results hold the time taken by each query.
+#
+def _init_worker(name, k, timing):
+    _init(sharedgraph.attach(name), k, timing)
+
+    return
+
+## Answers a chunk of query lines.
+#
+# @param chunk The list of lines.
+#
+# @retval "" The result lines, one for each line that is not blank.
+#
+def _solve_chunk(chunk):
+    return "".join("%s\n" % json.dumps(_solve(line)) for line in chunk
+                   if line.strip())
+
+## Answers a single query line.
+#
+# @param line The JSON query.
+#
+# @retval {} The result of the query.
+#
+def _solve(line):
+    started = time.time()
+    query = None
+    try:
+        query = json.loads(line)
+        if isinstance(query, list):
+            query = dict(zip(("source", "sink", "k"), query))
+
+        result = dict(query)
+        result.setdefault("k", _default_k)
+        source = query["source"]
+        sink = query["sink"]
+        if _graph[source] is None or _graph[sink] is None:
+            raise KeyError(source if _graph[source] is None else sink)
+        max_k = int(result["k"])
+        if max_k < 1:
+            raise ValueError("K must be at least 1, not %d" % max_k)
+
+        result["paths"] = [item.to_dict() for item in
+                           algorithms.ksp_yen(_graph, source, sink, max_k)
+                           if item.nodes]
+    except (ValueError, KeyError, TypeError), error:
+        result = dict(query) if isinstance(query, dict) else {}
+        result["error"] = "%s: %s" % (error.__class__.__name__, error)
+        result["query"] = line.strip()
+
+    if _timing:
+        result["time"] = round(time.time() - started, 6)
+
+    return result
+
+
+if __name__ == "__main__":
+    sys.exit(main())
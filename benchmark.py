@@ -0,0 +1,115 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+#  benchmark.py
+#
+#  Copyright 2012 Kevin R <KRPent@gmail.com>
+#
+#  This program is free software; you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation; either version 2 of the License, or
+#  (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software
+#  Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston,
+#  MA 02110-1301, USA.
+#
+#
+import os
+import sys
+import time
+import subprocess
+from graph import DiGraph
+
+
+## @package benchmark
+# Measures the start up cost of the graph module.
+#
+# The import time of a module is measured in a new interpreter each time, so
+# that nothing is already imported, and is reported together with the modules
+# the import loaded. The construction time is the average time taken to create
+# an empty graph, a graph loaded from data, and a graph with its painter.
+#
+# usage: benchmark.py [repeat]
+
+## Measures the time taken to import a module in a new interpreter.
+#
+# @param module The name of the module.
+# @param repeat The amount of interpreters the import is timed in.
+#
+# @retval () The best time in seconds, and the list of the modules of the
+# package that the import loaded.
+#
+def time_import(module, repeat=5):
+    directory = os.path.dirname(os.path.abspath(__file__))
+    code = ("import os, sys, time\n"
+            "started = time.time()\n"
+            "import %s\n"
+            "print time.time() - started\n"
+            "print ' '.join(sorted(name for name, value in "
+            "sys.modules.items() if hasattr(value, '__file__') and "
+            "os.path.abspath(value.__file__).startswith(%r)))" %
+            (module, directory))
+
+    best = None
+    modules = []
+    for i in xrange(repeat):
+        output = subprocess.check_output([sys.executable, "-c", code],
+                                         cwd=directory)
+        seconds, names = output.split("\n", 1)
+        if best is None or float(seconds) < best:
+            best = float(seconds)
+        modules = names.split()
+
+    return (best, modules)
+
+## Measures the average time taken to construct graphs.
+#
+# @param count The amount of graphs constructed.
+# @param name The identifier of the graph data that is loaded, if not
+# specified the graphs are empty.
+# @param painted Whether the painter of each graph is created as well.
+#
+# @retval float The average time in seconds.
+#
+def time_construction(count, name=None, painted=False):
+    started = time.time()
+    for i in xrange(count):
+        graph = DiGraph(name)
+        if painted:
+            graph.painter()
+
+    return (time.time() - started) / count
+
+## Prints the import and construction times.
+#
+# @param argv The command line arguments, if not specified sys.argv is used.
+#
+# @retval int The exit status.
+#
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    count = int(argv[0]) if argv else 10000
+
+    for module in ("graph", "graphviz", "algorithms"):
+        seconds, modules = time_import(module)
+        print "import %-12s %8.2f ms\t%s" % (module, seconds * 1000,
+                                              " ".join(modules))
+
+    for label, name, painted in (("empty", None, False),
+                                 ("loaded", "net5", False),
+                                 ("painted", "net5", True)):
+        seconds = time_construction(count, name, painted)
+        print "DiGraph %-11s %8.2f us" % (label, seconds * 1000000)
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,354 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+#  compact.py
+#
+#  Copyright 2012 Kevin R <KRPent@gmail.com>
+#
+#  This program is free software; you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation; either version 2 of the License, or
+#  (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software
+#  Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston,
+#  MA 02110-1301, USA.
+#
+#
+from array import array
+from graph import DiGraph
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
+## @brief Represents a directed graph as flat compressed sparse row arrays.
+#
+# Every node is given an integer index. The edges leaving node i are stored in
+# _targets and _costs between _offsets[i] and _offsets[i+1]. The arrays are
+# numpy arrays when numpy is available, otherwise array.array objects, so a
+# graph of millions of edges costs a few bytes per edge instead of a dictionary
+# entry per edge.
+#
+# The structure of the graph is frozen once built. The graph still supports
+# remove_edge and add_edge, as used by ksp_yen, by keeping a small overlay of
+# modified edge costs that is consulted whenever the edges of a node are read.
+class CompactGraph:
+    ## An edge with this cost signifies that it has been removed from the graph.
+    INFINITY = DiGraph.INFINITY
+
+    ## Represents a NULL predecessor.
+    UNDEFINDED = DiGraph.UNDEFINDED
+
+    ## The list of node names, where the position of a name is its index.
+    _names = None
+
+    ## Dictionary of node names to their index.
+    _index = None
+
+    ## Array of N + 1 offsets into _targets and _costs.
+    _offsets = None
+
+    ## Array of the index of the node each edge terminates at.
+    _targets = None
+
+    ## Array of the cost of each edge.
+    _costs = None
+
+    ## Dictionary of modified edge costs. Each key is the index of the node an
+    # edge starts at and the value is a dictionary of the index of the node the
+    # edge terminates at and its current cost.
+    # {0: {1: 10000}}
+    _overlay = None
+
+    ## Initializes the graph with the supplied arrays.
+    #
+    # @pre The offsets, targets and costs arrays describe a valid compressed
+    # sparse row graph over the supplied names.
+    #
+    # @param self The object pointer.
+    # @param names List of node names, where the position is the node index.
+    # @param offsets Array of len(names) + 1 edge offsets.
+    # @param targets Array of the index of the node each edge terminates at.
+    # @param costs Array of the cost of each edge.
+    #
+    def __init__(self, names, offsets, targets, costs):
+        self._names = names
+        self._index = dict((name, i) for i, name in enumerate(names))
+        self._offsets = offsets
+        self._targets = targets
+        self._costs = costs
+        self._overlay = {}
+
+        return
+
+    ## Gets the edges of a specified node.
+    #
+    # @param self The object pointer.
+    # @param node The node whose edges are being queried.
+    # @retval {} A dictionary of the edges and thier cost if the node exist
+    # within the graph or None if the node is not in the graph.
+    #
+    def __getitem__(self, node):
+        i = self._index.get(node)
+        if i is None:
+            return None
+
+        names = self._names
+        targets, costs = self.edges(i)
+        edges = dict((names[j], cost) for j, cost in zip(targets, costs))
+
+        if self._overlay.has_key(i):
+            for j, cost in self._overlay[i].iteritems():
+                edges[names[j]] = cost
+
+        return edges
+
+    ## Iterator for the graph object.
+    #
+    # @param self The object pointer.
+    # @retval iter An iterator over the node names of the graph.
+    #
+    def __iter__(self):
+        return iter(self._names)
+
+    ## The amount of nodes in the graph.
+    #
+    # @param self The object pointer.
+    # @retval int The amount of nodes.
+    #
+    def __len__(self):
+        return len(self._names)
+
+    ## The amount of edges in the graph.
+    #
+    # @param self The object pointer.
+    # @retval int The amount of edges.
+    #
+    def num_edges(self):
+        return int(self._offsets[len(self._names)])
+
+    ## The index of a node.
+    #
+    # @param self The object pointer.
+    # @param node The name of the node.
+    # @retval int The index of the node or None if the node is not in the
+    # graph.
+    #
+    def index(self, node):
+        return self._index.get(node)
+
+    ## The name of a node.
+    #
+    # @param self The object pointer.
+    # @param i The index of the node.
+    # @retval The name of the node.
+    #
+    def name(self, i):
+        return self._names[i]
+
+    ## The raw edges of a node, ignoring any modified edge costs.
+    #
+    # @param self The object pointer.
+    # @param i The index of the node.
+    # @retval () A tuple of two lists, the target indices and the edge costs.
+    #
+    def edges(self, i):
+        start = int(self._offsets[i])
+        end = int(self._offsets[i + 1])
+
+        return (_tolist(self._targets[start:end]),
+                _tolist(self._costs[start:end]))
+
+    ## The flat arrays of the graph.
+    # If edge costs have been modified, the costs array is a copy with the
+    # modified costs applied.
+    #
+    # @param self The object pointer.
+    # @retval () A tuple of the offsets, targets and costs arrays.
+    #
+    def arrays(self):
+        costs = self._costs
+        if self._overlay:
+            costs = costs.copy() if hasattr(costs, 'copy') else costs[:]
+            for i, edges in self._overlay.iteritems():
+                start = int(self._offsets[i])
+                targets = self.edges(i)[0]
+                for j, cost in edges.iteritems():
+                    costs[start + targets.index(j)] = cost
+
+        return (self._offsets, self._targets, costs)
+
+    ## The node names of the graph.
+    #
+    # @param self The object pointer.
+    # @retval [] The list of node names, where the position is the node index.
+    #
+    def names(self):
+        return self._names
+
+    ## Removes an edge from the graph by setting its cost to infinity.
+    #
+    # @param self The object pointer.
+    # @param node_from The node that the edge starts at.
+    # @param node_to The node that the edge terminates at.
+    # @param cost The cost of the edge, if the cost is not specified the edge
+    # is removed regardless of its cost.
+    # @retval int The cost of the edge that was removed. If the nodes of the
+    # edge does not exist, or the cost of the edge was found to be infinity, or
+    # if the specified edge does not exist, then -1 is returned.
+    #
+    def remove_edge(self, node_from, node_to, cost=None):
+        edges = self[node_from]
+        if edges is None or not edges.has_key(node_to):
+            return -1
+
+        current = edges[node_to]
+        if current == self.INFINITY or (cost and current != cost):
+            return -1
+
+        i = self._index[node_from]
+        self._overlay.setdefault(i, {})[self._index[node_to]] = self.INFINITY
+
+        return current
+
+    ## Sets the cost of an existing edge of the graph.
+    # The structure of a compact graph is frozen, so only edges that exist in
+    # the graph can be added back, e.g. after being removed with remove_edge.
+    #
+    # @param self The object pointer.
+    # @param node_from The node that the edge starts at.
+    # @param node_to The node that the edge terminates at.
+    # @param cost The cost of the edge.
+    # @retval bool True if the edge cost was set, False if the edge is not part
+    # of the graph.
+    #
+    def add_edge(self, node_from, node_to, cost=None):
+        i = self._index.get(node_from)
+        j = self._index.get(node_to)
+        if i is None or j is None:
+            return False
+
+        targets, costs = self.edges(i)
+        if j not in targets:
+            return False
+
+        overlay = self._overlay.setdefault(i, {})
+        if cost is None or cost == costs[targets.index(j)]:
+            overlay.pop(j, None)
+            if not overlay:
+                del self._overlay[i]
+        else:
+            overlay[j] = cost
+
+        return True
+
+    ## Converts the graph into the dictionary format used by DiGraph.
+    #
+    # @param self The object pointer.
+    # @retval {} Dictionary of nodes, where each value is a dictionary of edges
+    # and their cost.
+    #
+    def to_data(self):
+        return dict((name, self[name]) for name in self._names)
+
+
+## Builds a compact graph from edge arrays by a counting sort on the source.
+#
+# @param num_nodes The amount of nodes in the graph.
+# @param sources Sequence of the index of the node each edge starts at.
+# @param targets Sequence of the index of the node each edge terminates at.
+# @param costs Sequence of the cost of each edge.
+# @param names List of node names, if not specified the nodes are named "N0"
+# to "N(num_nodes - 1)" as in DiGraph.random.
+#
+# @retval CompactGraph The graph holding the supplied edges.
+#
+def from_edges(num_nodes, sources, targets, costs, names=None):
+    if names is None:
+        names = ["N%d" % i for i in xrange(num_nodes)]
+
+    if numpy is not None:
+        sources = numpy.asarray(sources, dtype=numpy.int64)
+        order = numpy.argsort(sources, kind='mergesort')
+        counts = numpy.bincount(sources, minlength=num_nodes)
+
+        offsets = numpy.zeros(num_nodes + 1, dtype=numpy.int64)
+        numpy.cumsum(counts, out=offsets[1:])
+
+        targets = numpy.asarray(targets, dtype=numpy.int64)[order]
+        costs = numpy.asarray(costs)[order]
+
+        return CompactGraph(names, offsets, targets, costs)
+
+    offsets = array('l', [0]) * (num_nodes + 1)
+    for s in sources:
+        offsets[s + 1] += 1
+    for i in xrange(num_nodes):
+        offsets[i + 1] += offsets[i]
+
+    position = array('l', offsets[:-1])
+    targets_out = array('l', [0]) * len(sources)
+    costs_out = array(_typecode(costs), [0]) * len(sources)
+    for k in xrange(len(sources)):
+        s = sources[k]
+        p = position[s]
+        targets_out[p] = targets[k]
+        costs_out[p] = costs[k]
+        position[s] = p + 1
+
+    return CompactGraph(names, offsets, targets_out, costs_out)
+
+## Builds a compact graph from a DiGraph, or any graph with the same interface.
+#
+# @param graph The graph to convert.
+#
+# @retval CompactGraph The graph holding the same nodes and edges.
+#
+def from_digraph(graph):
+    names = list(graph)
+    index = dict((name, i) for i, name in enumerate(names))
+
+    sources = []
+    targets = []
+    costs = []
+    for i, name in enumerate(names):
+        for node_to, cost in graph[name].iteritems():
+            sources.append(i)
+            targets.append(index[node_to])
+            costs.append(cost)
+
+    return from_edges(len(names), sources, targets, costs, names)
+
+## Chooses the array type code able to hold the supplied costs.
+#
+# @param costs Sequence of edge costs.
+#
+# @retval "" 'l' if every cost is an integer, 'd' otherwise.
+#
+def _typecode(costs):
+    for cost in costs:
+        if not isinstance(cost, (int, long)):
+            return 'd'
+
+    return 'l'
+
+## Converts an array slice into a list of python values.
+#
+# @param values A slice of a numpy array, array.array or list.
+#
+# @retval [] The values as a list.
+#
+def _tolist(values):
+    if hasattr(values, 'tolist'):
+        return values.tolist()
+
+    return list(values)
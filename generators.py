@@ -0,0 +1,318 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+#  generators.py
+#
+#  Copyright 2012 Kevin R <KRPent@gmail.com>
+#
+#  This program is free software; you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation; either version 2 of the License, or
+#  (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software
+#  Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston,
+#  MA 02110-1301, USA.
+#
+#
+import os
+import json
+import math
+import random
+import compact
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
+## @package generators
+# Generates random graphs of a fixed size in time linear to the amount of edges.
+#
+# Each generator returns the edges of the graph as a tuple of three sequences,
+# (sources, targets, costs), where sources and targets are node indices from 0
+# to num_nodes - 1 and every edge is distinct. The sequences are numpy arrays
+# when numpy is available and lists otherwise. The same seed always generates
+# the same graph, although numpy and pure python generate different graphs.
+#
+# The edges can then be written into a DiGraph with to_digraph, into a
+# CompactGraph with compact.from_edges, or straight to the json format read by
+# DiGraph.load with write_json.
+
+## Generates a graph with edges chosen uniformly at random.
+# Each edge is one of the num_nodes * (num_nodes - 1) possible edges without
+# self loops, and no edge is chosen twice.
+#
+# @param num_nodes The amount of nodes the graph should contain.
+# @param num_edges The amount of edges the graph should contain.
+# @param max_cost The maximum cost of any edge in the graph.
+# @param seed The seed of the random generator.
+#
+# @retval () The sources, targets and costs of the edges.
+#
+def erdos_renyi(num_nodes, num_edges, max_cost, seed=None):
+    pairs = num_nodes * (num_nodes - 1)
+    if num_edges > pairs:
+        raise ValueError("%d nodes can hold at most %d edges" %
+                         (num_nodes, pairs))
+
+    if numpy is not None:
+        rng = numpy.random.RandomState(_seed(seed))
+
+        if 2 * num_edges > pairs:
+            picks = rng.permutation(pairs)[:num_edges]
+        else:
+            picks = numpy.empty(0, dtype=numpy.int64)
+            while len(picks) < num_edges:
+                size = int((num_edges - len(picks)) * 1.1) + 16
+                draw = rng.randint(0, pairs, size=size).astype(numpy.int64)
+                picks = numpy.unique(numpy.concatenate((picks, draw)))
+            picks = rng.permutation(picks)[:num_edges]
+
+        sources, rest = numpy.divmod(picks, num_nodes - 1)
+        targets = rest + (rest >= sources)
+        costs = rng.randint(1, max_cost + 1, size=num_edges)
+
+        return (sources, targets, costs)
+
+    rand = random.Random(_seed(seed))
+    sources = []
+    targets = []
+    for pick in rand.sample(xrange(pairs), num_edges):
+        node_from, rest = divmod(pick, num_nodes - 1)
+        sources.append(node_from)
+        targets.append(rest + (rest >= node_from))
+    costs = [rand.randrange(0, max_cost) + 1 for edge in xrange(num_edges)]
+
+    return (sources, targets, costs)
+
+## Generates a grid graph where each node is connected in both directions to
+# the nodes to its right and below it. Node r * cols + c is at row r, column c.
+#
+# @param rows The amount of rows in the grid.
+# @param cols The amount of columns in the grid.
+# @param max_cost The maximum cost of any edge in the graph.
+# @param seed The seed of the random generator.
+#
+# @retval () The sources, targets and costs of the edges.
+#
+def grid(rows, cols, max_cost, seed=None):
+    if numpy is not None:
+        rng = numpy.random.RandomState(_seed(seed))
+        nodes = numpy.arange(rows * cols, dtype=numpy.int64).reshape(rows,
+                                                                    cols)
+
+        right = (nodes[:, :-1].ravel(), nodes[:, 1:].ravel())
+        down = (nodes[:-1, :].ravel(), nodes[1:, :].ravel())
+        sources = numpy.concatenate((right[0], right[1], down[0], down[1]))
+        targets = numpy.concatenate((right[1], right[0], down[1], down[0]))
+        costs = rng.randint(1, max_cost + 1, size=len(sources))
+
+        return (sources, targets, costs)
+
+    rand = random.Random(_seed(seed))
+    sources = []
+    targets = []
+    for r in xrange(rows):
+        for c in xrange(cols):
+            node = r * cols + c
+            if c + 1 < cols:
+                sources.extend((node, node + 1))
+                targets.extend((node + 1, node))
+            if r + 1 < rows:
+                sources.extend((node, node + cols))
+                targets.extend((node + cols, node))
+    costs = [rand.randrange(0, max_cost) + 1 for edge in sources]
+
+    return (sources, targets, costs)
+
+## Generates a random geometric graph. The nodes are placed uniformly in the
+# unit square and every pair of nodes within the radius is connected in both
+# directions, with a cost from 1 to max_cost proportional to their distance.
+# Candidate pairs are found by bucketing the nodes into cells the size of the
+# radius, so only neighbouring cells are compared.
+#
+# @param num_nodes The amount of nodes the graph should contain.
+# @param radius The maximum distance between two connected nodes.
+# @param max_cost The maximum cost of any edge in the graph.
+# @param seed The seed of the random generator.
+#
+# @retval () The sources, targets and costs of the edges.
+#
+def geometric(num_nodes, radius, max_cost, seed=None):
+    if numpy is not None:
+        rng = numpy.random.RandomState(_seed(seed))
+        points = rng.random_sample((num_nodes, 2)).tolist()
+    else:
+        rand = random.Random(_seed(seed))
+        points = [(rand.random(), rand.random()) for node in xrange(num_nodes)]
+
+    cells = {}
+    for node, (x, y) in enumerate(points):
+        cells.setdefault((int(x / radius), int(y / radius)), []).append(node)
+
+    sources = []
+    targets = []
+    costs = []
+    for (cx, cy), members in cells.iteritems():
+        for dx, dy in ((0, 0), (1, -1), (1, 0), (1, 1), (0, 1)):
+            others = cells.get((cx + dx, cy + dy))
+            if not others:
+                continue
+
+            for a in members:
+                ax, ay = points[a]
+                for b in others:
+                    if (dx, dy) == (0, 0) and b <= a:
+                        continue
+
+                    distance = math.hypot(ax - points[b][0], ay - points[b][1])
+                    if distance > radius:
+                        continue
+
+                    cost = 1 + int(distance / radius * (max_cost - 1))
+                    sources.extend((a, b))
+                    targets.extend((b, a))
+                    costs.extend((cost, cost))
+
+    return _arrays(sources, targets, costs)
+
+## Generates a scale free graph by preferential attachment. Each new node is
+# connected in both directions to num_links distinct existing nodes, chosen
+# with a probability proportional to their degree.
+#
+# @param num_nodes The amount of nodes the graph should contain.
+# @param num_links The amount of nodes each new node is connected to.
+# @param max_cost The maximum cost of any edge in the graph.
+# @param seed The seed of the random generator.
+#
+# @retval () The sources, targets and costs of the edges.
+#
+def barabasi_albert(num_nodes, num_links, max_cost, seed=None):
+    if num_links < 1 or num_links >= num_nodes:
+        raise ValueError("num_links must be between 1 and num_nodes - 1")
+
+    rand = random.Random(_seed(seed))
+
+    # Every node appears in repeated once for each edge it has, so a uniform
+    # choice from repeated is a choice proportional to degree.
+    repeated = []
+    sources = []
+    targets = []
+    chosen = range(num_links)
+    for node in xrange(num_links, num_nodes):
+        for node_to in chosen:
+            sources.extend((node, node_to))
+            targets.extend((node_to, node))
+        repeated.extend(chosen)
+        repeated.extend([node] * num_links)
+
+        chosen = set()
+        while len(chosen) < num_links:
+            chosen.add(rand.choice(repeated))
+
+    costs = [rand.randrange(0, max_cost) + 1 for edge in sources]
+
+    return _arrays(sources, targets, costs)
+
+## Converts generated edges into the dictionary format of DiGraph.
+#
+# @param edges The sources, targets and costs of the edges.
+# @param num_nodes The amount of nodes in the graph.
+#
+# @retval {} Dictionary of the nodes "N0" to "N(num_nodes - 1)", where each
+# value is a dictionary of edges and their cost.
+#
+def to_data(edges, num_nodes):
+    sources, targets, costs = [compact._tolist(values) for values in edges]
+
+    names = ["N%d" % node for node in xrange(num_nodes)]
+    data = dict((name, {}) for name in names)
+    for node_from, node_to, cost in zip(sources, targets, costs):
+        data[names[node_from]][names[node_to]] = cost
+
+    return data
+
+## Replaces the nodes and edges of a DiGraph with generated edges.
+#
+# @post The _data dictionary of the graph will contain the generated nodes
+# and edges.
+#
+# @param edges The sources, targets and costs of the edges.
+# @param num_nodes The amount of nodes in the graph.
+# @param graph The DiGraph to populate.
+#
+# @retval DiGraph The populated graph.
+#
+def to_digraph(edges, num_nodes, graph):
+    graph._data = to_data(edges, num_nodes)
+
+    return graph
+
+## Writes generated edges as a json graph that can be loaded by DiGraph.
+# The file is written one node at a time from a compact graph, so the whole
+# dictionary of the graph is never held in memory.
+#
+# @post There exist a ".json" file at the supplied directory with the graph
+# data.
+#
+# @param edges The sources, targets and costs of the edges.
+# @param num_nodes The amount of nodes in the graph.
+# @param name The identifier for the graph.
+# @param directory The location that the graph data is stored.
+#
+def write_json(edges, num_nodes, name, directory="data/json/"):
+    if not os.path.exists(directory):
+        os.mkdir(directory)
+
+    graph = compact.from_edges(num_nodes, *edges)
+    names = graph.names()
+
+    fhandle = open("%s%s.json" % (directory, name), 'w')
+    fhandle.write("{")
+    for i, node in enumerate(names):
+        targets, costs = graph.edges(i)
+        fhandle.write("%s%s: {%s}" %
+                      (", " if i else "", json.dumps(node),
+                       ", ".join("%s: %s" % (json.dumps(names[j]), cost)
+                                 for j, cost in zip(targets, costs))))
+    fhandle.write("}")
+    fhandle.close()
+
+    return
+
+## Chooses the seed of a generator. Without a seed the global random module is
+# used, so graphs stay reproducible through random.seed.
+#
+# @param seed The supplied seed or None.
+#
+# @retval int The seed to use.
+#
+def _seed(seed):
+    if seed is None:
+        return random.getrandbits(32)
+
+    return seed
+
+## Converts edge lists into numpy arrays when numpy is available.
+#
+# @param sources List of the node each edge starts at.
+# @param targets List of the node each edge terminates at.
+# @param costs List of the cost of each edge.
+#
+# @retval () The sources, targets and costs of the edges.
+#
+def _arrays(sources, targets, costs):
+    if numpy is not None:
+        return (numpy.array(sources, dtype=numpy.int64),
+                numpy.array(targets, dtype=numpy.int64),
+                numpy.array(costs, dtype=numpy.int64))
+
+    return (sources, targets, costs)
@@ -24,7 +24,6 @@
 import os
 import json
 import random
-from graphviz import Graphviz
 
 
 ## @brief Represents a directed graph of nodes and edges.
@@ -37,7 +36,8 @@ class DiGraph:
     ## The location that the graph data is stored as json objects.
     _directory_data = "data/json/"
     
-    ## The Graphviz object that will be used to display the graph.
+    ## The Graphviz object that will be used to display the graph, created on
+    # first use so that graphs that are never painted do not load graphviz.
     _painter = None
     
     ## An edge with this cost signifies that it has been removed from the graph.
@@ -57,7 +57,7 @@ class DiGraph:
     # the edge.
     _data = {}
     
-    ## Initializes the graph with an indentifier and Graphviz object.
+    ## Initializes the graph with an indentifier.
     #    
     # @post The graph will contain the data specified by the identifier, if that
     # data exist. If not, then the graph will be empty.
@@ -70,9 +70,9 @@ class DiGraph:
         if name:
             self._name = name
         
+        self._data = {}
         self.load()
         
-        self._painter = Graphviz()
         return
 
     ## Gets the edges of a specified node.
@@ -123,7 +123,7 @@ class DiGraph:
     # cost is generated from 1 to 10.
     #
     def add_edge(self, node_from, node_to, cost=None):
-        if not cost:
+        if cost is None:
             cost = random.randrange(1, 11)
         
         self.add_node(node_from)
@@ -219,7 +219,7 @@ class DiGraph:
     # 
     def export(self, frames=False, painter=None):
         if not painter:
-            painter = self._painter
+            painter = self.painter()
         
         painter.set_graph(self._data)
         painter.generate(self._name, frames)
@@ -227,6 +227,8 @@ class DiGraph:
         return
     
     ## Populates the graph with random data.
+    # Exactly num_edges distinct edges are chosen in time linear to the amount
+    # of edges, see generators.erdos_renyi.
     #
     # @post The _data dictionary will contain all the nodes and edges of the 
     # graph.
@@ -235,22 +237,14 @@ class DiGraph:
     # @param num_nodes The amount of nodes the graph should contain.
     # @param num_edges The amount of edges the graph should contain.
     # @param max_cost The maximum cost of any edge in the graph.
+    # @param seed The seed of the random generator, if not specified the 
+    # global random module is used.
     # 
-    def random(self, num_nodes, num_edges, max_cost):
-        self._data = {}
+    def random(self, num_nodes, num_edges, max_cost, seed=None):
+        import generators
         
-        for node in range(num_nodes):
-            self.add_node("N%d" % node)
-        
-        for edge in range(num_edges):
-            node_from = random.choice(self._data.keys())
-            
-            node_to = node_from
-            while node_to == node_from:
-                node_to = random.choice(self._data.keys())
-            
-            cost = random.randrange(0, max_cost) + 1
-            self.add_edge(node_from, node_to, cost)
+        edges = generators.erdos_renyi(num_nodes, num_edges, max_cost, seed)
+        generators.to_digraph(edges, num_nodes, self)
         
         return
     
@@ -273,11 +267,16 @@ class DiGraph:
     
     ## The reference to the Graphviz object.
     #    
-    # @pre The _painter variable has been initialized with the Graphviz object.
+    # @post The _painter variable will be initialized with the Graphviz object.
     #
     # @param self The object pointer.
     # @retval Graphviz The Graphviz object used by the graph.
     #
     def painter(self):
+        if self._painter is None:
+            from graphviz import Graphviz
+            
+            self._painter = Graphviz()
+        
         return self._painter
 
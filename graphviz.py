@@ -23,6 +23,11 @@
 # 
 import os
 import codecs
+import shutil
+import hashlib
+import subprocess
+import multiprocessing
+from multiprocessing.pool import ThreadPool
 
 
 ## @brief Generates images based on the Graph class.
@@ -67,9 +72,9 @@ class Graphviz:
     
     ## Container for all the paths that are to be displayed.
     # The container is a list of dictionaries. Each dictionary has three key-
-    # value pairs, path, colorNode, and colorEdge. Path is a string of the 
-    # nodes in the path, where colorNode is the color to paint each node in the
-    # path, and colorEdge is the color to paint each edge.
+    # value pairs, path, colorNode, and colorEdge. Path is a string or list of 
+    # the nodes in the path, where colorNode is the color to paint each node in
+    # the path, and colorEdge is the color to paint each edge.
     # [{ path: "", colorNode: "", colorEdge:""}, {}]
     _container_paths = [] 
     
@@ -80,9 +85,9 @@ class Graphviz:
     _container_ranks = []
     
     ## Container for all the edges that have infinity cost.
-    # The container is a list of strings. Each string is the nodes that make up
+    # The container is a list of tuples. Each tuple is the nodes that make up
     # the edge of infinite cost.
-    # ["",""]
+    # [("",""),("","")]
     _container_infinite = []
     
     ## The source node of the layout.    
@@ -99,20 +104,31 @@ class Graphviz:
     ## Frame number of the current image.
     _frame_num = 0
     
+    ## Container for the frames waiting to be rendered in batch mode, or None
+    # if the painter is not in batch mode. 
+    # The container is a list of tuples. Each tuple is the name of the frame, 
+    # the digest of its dot markup, and whether the image on disk is already 
+    # up to date.
+    # [("", "", False)]
+    _container_batch = None
+    
+    ## The maximum amount of dot processes run at once in batch mode.
+    _batch_workers = 1
+    
     ## Initializes the Graphviz painter with the dot template.
+    # The template is read once per process and shared by every painter.
     #
     # @pre The template dot file exist in the template directory.
-    # @post The format for the body of the dot graph will be set.
+    # @post The format for the body of the dot graph will be set and the 
+    # painter will be in its default state.
     #
     # @param self The object pointer.
     # 
     def __init__(self):
         path = "%s%s" % (self._directory_templates, self._template_dot)
         
-        if os.path.exists(path):        
-            fhandle = open(path, 'r')
-            self._format_body = fhandle.read()
-            fhandle.close()
+        self._format_body = _load_template(path)
+        self.reset()
         
         return
     
@@ -170,7 +186,7 @@ class Graphviz:
     #
     # @param self The object pointer.
     # @param nodes String of nodes in the path, i.e. "ABC" for the path A to B 
-    # to C.
+    # to C, or a list of nodes, i.e. ["A", "B", "C"].
     # @param color_node The color that the nodes of the path will be painted. 
     # @param color_edge The color that the edges of the path will be painted.
     #
@@ -200,7 +216,7 @@ class Graphviz:
     # @param node_to The node that the edge terminates at.
     #
     def add_infinite_edge(self, node_from, node_to):
-        self._container_infinite.append("%s%s" % (node_from, node_to))
+        self._container_infinite.append((node_from, node_to))
         
         return
     
@@ -285,18 +301,106 @@ class Graphviz:
             name = "%s-%s" % (name, self._frame_num)
             self._frame_num += 1
         
-        self.create_dot(name)
-        self.create_image(name)
+        if self._container_batch is None:
+            self.create_dot(name)
+            self.create_image(name)
+            return
+        
+        digest_old = self.find_rendered_digest(name)
+        digest = self.create_dot(name)
+        self._container_batch.append((name, digest, digest == digest_old))
+        
+        return
+    
+    ## Puts the painter in batch mode.
+    # In batch mode generate only writes the dot markup and queues the image, 
+    # so the frames of an animation can be rendered concurrently by end_batch.
+    #
+    # @post The _container_batch list will be empty.
+    #
+    # @param self The object pointer.
+    # @param workers The maximum amount of dot processes run at once, if not 
+    # specified the amount of processors is used.
+    #
+    def begin_batch(self, workers=None):
+        self._container_batch = []
+        self._batch_workers = workers or multiprocessing.cpu_count()
         
         return
     
+    ## Renders the queued frames and leaves batch mode.
+    # Frames whose image on disk was successfully rendered from the same dot 
+    # markup, according to the digest stored with it, are skipped, and frames 
+    # with the same markup as another frame of the batch are copied from it 
+    # instead of being rendered again.
+    #
+    # @pre The painter is in batch mode.
+    # @post The images of the queued frames will be in _directory_images and 
+    # _container_batch will be None.
+    #
+    # @param self The object pointer.
+    # @param animation The file name of an animation assembled from the frames 
+    # in _directory_images, i.e. "yen.gif", if not specified no animation is 
+    # created.
+    # @param delay The delay between the frames of the animation in 
+    # hundredths of a second.
+    # @retval bool True if every image was created successfully, False 
+    # otherwise.
+    #
+    def end_batch(self, animation=None, delay=100):
+        frames = self._container_batch
+        self._container_batch = None
+        
+        sources = {}
+        for name, digest, unchanged in frames:
+            if unchanged:
+                sources.setdefault(digest, name)
+        
+        pending = []
+        copies = []
+        for name, digest, unchanged in frames:
+            if unchanged:
+                continue
+            elif sources.has_key(digest):
+                copies.append((sources[digest], name))
+            else:
+                sources[digest] = name
+                pending.append(name)
+        
+        pool = ThreadPool(self._batch_workers)
+        results = pool.map(lambda name: self.create_image(name, True), 
+                           pending)
+        pool.close()
+        pool.join()
+        
+        success = all(results)
+        for name_from, name_to in copies:
+            path_from = "%s%s.png" % (self._directory_images, name_from)
+            if self.find_rendered_digest(name_from) is not None:
+                shutil.copyfile(path_from, "%s%s.png" % (self._directory_images,
+                                                         name_to))
+                shutil.copyfile("%s%s.sha1" % (self._directory_images,
+                                                name_from),
+                                "%s%s.sha1" % (self._directory_images, name_to))
+            else:
+                success = False
+        
+        if animation:
+            success = self.create_animation([frame[0] for frame in frames], 
+                                            animation, delay) and success
+        
+        return success
+    
     ## Generates the dot markup file for the graph data.
+    # The nodes and edges are streamed to the file one line at a time, so the 
+    # markup of the graph is never built as a single string.
     #
     # @pre The graph data and _format_body has been set.
     # @post The dot file for the graph will exist at _directory_data.
     #
     # @param self The object pointer.
     # @param name The name of the dot file to be generated.
+    # @retval "" The hex digest of the dot markup.
     #
     def create_dot(self, name):
         if not os.path.exists(self._directory_data):
@@ -304,41 +408,131 @@ class Graphviz:
         
         fhandle = codecs.open("%s%s.dot" % (self._directory_data, name), 
                               encoding='utf-8', mode='w')
+        writer = _DigestWriter(fhandle)
+        self.write_dot(writer)
+        fhandle.close()
         
-        fields = self.parse_graph()
-        fields.append(self.parse_rank())
-        fields.append(self.parse_source_sink())
-        fields.append(self._format_legend_color)
-        fields.extend(self.parse_legend())
+        return writer.digest()
+    
+    ## Writes the dot markup for the graph data to an open file.
+    # Each "%s" field of _format_body is filled in order with the nodes, the
+    # edges, the ranks, the source and sink, the legend color and the four 
+    # lines of legend text.
+    #
+    # @pre The graph data and _format_body has been set.
+    #
+    # @param self The object pointer.
+    # @param fhandle The file object, or any object with a write method, that 
+    # the markup is written to.
+    #
+    def write_dot(self, fhandle):
+        node_colors, edge_colors = self.find_colors()
         
-        body = self._format_body % tuple(fields)
-        fhandle.write(body)
+        fields = [self.iter_nodes(node_colors), self.iter_edges(edge_colors),
+                  [self.parse_rank()], [self.parse_source_sink()], 
+                  [self._format_legend_color]]
+        fields.extend([line] for line in self.parse_legend())
         
-        fhandle.close()
+        chunks = self._format_body.split("%s")
+        fhandle.write(chunks[0])
+        for field, chunk in zip(fields, chunks[1:]):
+            for text in field:
+                fhandle.write(text)
+            fhandle.write(chunk)
         
-        return 
+        return
     
     ## Generates the image file for the graph data.
+    # Any digest stored with a previous image is removed, see 
+    # find_rendered_digest.
     #
     # @pre The dot file has been generated properly.
     # @post The image for the graph will exist at _directory_images.
     #
     # @param self The object pointer.
     # @param name The name of the image file to be generated.
+    # @param digest Whether the digest of the dot markup is stored next to the 
+    # image once it has been rendered successfully, as end_batch does.
     # @retval bool True if the image was created successfully, False otherwise.
     #
-    def create_image(self, name):
+    def create_image(self, name, digest=False):
         path_dot = "%s%s.dot" % (self._directory_data, name)
         path_png = "%s%s.png" % (self._directory_images, name)
+        path_digest = "%s%s.sha1" % (self._directory_images, name)
         
+        if os.path.exists(path_digest):
+            os.remove(path_digest)
         if not os.path.exists(path_dot):
             return False
         
-        cmd = "dot %s -Tpng -o %s" % (path_dot, path_png)
-        if os.system(cmd) == 0:
-            return True
-        else:
+        digest_dot = self.find_digest(path_dot) if digest else None
+        if not _run(["dot", path_dot, "-Tpng", "-o", path_png]):
             return False
+        
+        if digest_dot is not None:
+            fhandle = open(path_digest, 'w')
+            fhandle.write(digest_dot)
+            fhandle.close()
+        
+        return True
+    
+    ## Assembles images into an animation with ImageMagick.
+    #
+    # @pre The images exist in _directory_images.
+    # @post The animation will exist at _directory_images.
+    #
+    # @param self The object pointer.
+    # @param names The names of the images, in the order they are shown.
+    # @param animation The file name of the animation. A ".gif" name creates a 
+    # GIF, any other name an animated PNG.
+    # @param delay The delay between the images in hundredths of a second.
+    # @retval bool True if the animation was created successfully, False 
+    # otherwise.
+    #
+    def create_animation(self, names, animation, delay=100):
+        path_animation = "%s%s" % (self._directory_images, animation)
+        if not animation.lower().endswith(".gif"):
+            path_animation = "APNG:%s" % path_animation
+        
+        cmd = ["convert", "-delay", str(delay), "-loop", "0"]
+        cmd.extend("%s%s.png" % (self._directory_images, name) 
+                   for name in names)
+        cmd.append(path_animation)
+        
+        return _run(cmd)
+    
+    ## Computes the digest of an existing dot file.
+    #
+    # @param self The object pointer.
+    # @param path The path of the dot file.
+    # @retval "" The hex digest of the file contents.
+    #
+    def find_digest(self, path):
+        fhandle = open(path, 'rb')
+        digest = hashlib.sha1(fhandle.read()).hexdigest()
+        fhandle.close()
+        
+        return digest
+    
+    ## Reads the digest of the dot markup an image was last rendered from in 
+    # batch mode.
+    #
+    # @param self The object pointer.
+    # @param name The name of the image file.
+    # @retval "" The hex digest, or None if the image does not exist or was 
+    # not rendered successfully.
+    #
+    def find_rendered_digest(self, name):
+        path_png = "%s%s.png" % (self._directory_images, name)
+        path_digest = "%s%s.sha1" % (self._directory_images, name)
+        if not os.path.exists(path_png) or not os.path.exists(path_digest):
+            return None
+        
+        fhandle = open(path_digest, 'r')
+        digest = fhandle.read().strip()
+        fhandle.close()
+        
+        return digest
     
     ## Formats the nodes and edges of the graph data.
     #
@@ -349,29 +543,45 @@ class Graphviz:
     # formatted string.
     #
     def parse_graph(self):
-        nodes = ""
-        edges = ""
+        node_colors, edge_colors = self.find_colors()
+        
+        return ["".join(self.iter_nodes(node_colors)), 
+                "".join(self.iter_edges(edge_colors))]
+    
+    ## Formats each node of the graph data.
+    #
+    # @pre The graph data and _format_node has been set.
+    #
+    # @param self The object pointer.
+    # @param node_colors Dictionary of nodes to their color, see find_colors.
+    # @retval iter An iterator of the formatted line of each node.
+    #
+    def iter_nodes(self, node_colors):
+        for node in self._graph:
+            yield self._format_node % (node, node_colors.get(node, "")) + "\n\t"
+    
+    ## Formats each edge of the graph data.
+    #
+    # @pre The graph data and _format_edge has been set.
+    #
+    # @param self The object pointer.
+    # @param edge_colors Dictionary of edges to their color, see find_colors.
+    # @retval iter An iterator of the formatted line of each edge.
+    #
+    def iter_edges(self, edge_colors):
+        infinite = set(self._container_infinite)
+        style_infinite = "style=dashed, color=\"%s\"" \
+                         % self._format_infinity_color
         
         for node, nitems in self._graph.iteritems():
-            nodes += self._format_node % (node, self.find_node_color(node)) \
-                     + "\n\t"
-            
             for node_to, cost in nitems.iteritems():
-                if (node + node_to) in self._container_infinite:
-                    temp = self._format_edge % (node, node_to, u"∞", 
-                                                "style=dashed, color=\"%s\"" 
-                                                % self._format_infinity_color)
+                if (node, node_to) in infinite:
+                    yield self._format_edge % (node, node_to, u"∞", 
+                                               style_infinite) + "\n\t"
                 else:
-                    temp = self._format_edge % (node, node_to, cost, 
-                                                self.find_edge_color(node, 
-                                                                     node_to))
-                
-                if temp in edges:
-                    continue
-                else:
-                    edges += temp + "\n\t"
-        
-        return [nodes, edges]
+                    yield self._format_edge % (node, node_to, cost, 
+                                               edge_colors.get((node, node_to),
+                                                               "")) + "\n\t"
     
     ## Formats the rank of the nodes of the graph data.
     #
@@ -424,6 +634,29 @@ class Graphviz:
         
         return legend
     
+    ## Finds the colors of every node and edge based on the paths set.
+    # Paths are applied in the order they were added, so the color of a node or
+    # edge is the color of the last path containing it.
+    #
+    # @param self The object pointer.
+    # @retval () A tuple of two dictionaries, nodes to their color and edges, 
+    # as a tuple of two nodes, to their formatted color.
+    #
+    def find_colors(self):
+        node_colors = {}
+        edge_colors = {}
+        
+        for path_info in self._container_paths:
+            nodes = list(path_info['path'])
+            color_edge = ", penwidth=2, color=\"%s\"" % path_info['colorEdge']
+            
+            for node in nodes:
+                node_colors[node] = path_info['colorNode']
+            for edge in zip(nodes, nodes[1:]):
+                edge_colors[edge] = color_edge
+        
+        return (node_colors, edge_colors)
+    
     ## Finds the color of a node based on the paths set.
     #
     # @param self The object pointer.
@@ -431,12 +664,7 @@ class Graphviz:
     # @retval "" The color as a word or hex, "red" or "#333333".
     #
     def find_node_color(self, node):
-        color = ""
-        for path_info in self._container_paths:
-            if node in path_info['path']:
-                color = path_info['colorNode']
-        
-        return color
+        return self.find_colors()[0].get(node, "")
     
     ## Finds the color of a edge based on the paths set.
     #
@@ -446,11 +674,80 @@ class Graphviz:
     # @retval "" The color as a word or hex, "red" or "#333333".
     #
     def find_edge_color(self, node, node_to):
-        color = ""
-        edge = "%s%s" % (node, node_to)
-        for path_info in self._container_paths:
-            if edge in path_info['path']:
-                color = ", penwidth=2, color=\"%s\"" % path_info['colorEdge']
+        return self.find_colors()[1].get((node, node_to), "")
+
+
+## @brief Writes text to a file while computing the digest of the text.
+# 
+# The digest matches Graphviz.find_digest of the written file, since the text 
+# is hashed in the same utf-8 encoding the file is written in.
+#
+class _DigestWriter:
+    ## The file object the text is written to.
+    _fhandle = None
+    ## The hash object of the written text.
+    _hash = None
+    
+    ## Initializes the writer with the file object.
+    #
+    # @param self The object pointer.
+    # @param fhandle The file object the text is written to.
+    #
+    def __init__(self, fhandle):
+        self._fhandle = fhandle
+        self._hash = hashlib.sha1()
         
-        return color
+        return
+    
+    ## Writes text to the file.
+    #
+    # @param self The object pointer.
+    # @param text The text to be written.
+    #
+    def write(self, text):
+        self._fhandle.write(text)
+        if isinstance(text, unicode):
+            text = text.encode('utf-8')
+        self._hash.update(text)
+        
+        return
+    
+    ## The digest of the text written so far.
+    #
+    # @param self The object pointer.
+    # @retval "" The hex digest.
+    #
+    def digest(self):
+        return self._hash.hexdigest()
+
+## Runs an external command.
+#
+# @param cmd The command as a list of arguments.
+# @retval bool True if the command exited successfully, False otherwise.
+#
+def _run(cmd):
+    try:
+        return subprocess.call(cmd) == 0
+    except OSError:
+        return False
 
+## The templates read so far, by path.
+_templates = {}
+
+## Reads a template, caching it for the rest of the process.
+#
+# @param path The path of the template.
+# @retval "" The template, or None if the file does not exist.
+#
+def _load_template(path):
+    path = os.path.abspath(path)
+    if not _templates.has_key(path):
+        template = None
+        if os.path.exists(path):
+            fhandle = open(path, 'r')
+            template = fhandle.read()
+            fhandle.close()
+        
+        _templates[path] = template
+    
+    return _templates[path]
@@ -0,0 +1,566 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+#  harness.py
+#
+#  Copyright 2012 Kevin R <KRPent@gmail.com>
+#
+#  This program is free software; you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation; either version 2 of the License, or
+#  (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software
+#  Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston,
+#  MA 02110-1301, USA.
+#
+#
+import os
+import sys
+import gc
+import json
+import time
+import shutil
+import argparse
+import tempfile
+import itertools
+import algorithms
+import apsp
+import compact
+import partition
+import sssp
+import tracer
+from graph import DiGraph
+from graphviz import Graphviz
+
+
+## @package harness
+# Checks the results and the speed of every shortest path engine.
+#
+# The check generates many small random graphs with DiGraph.random, a quarter
+# of them with edges of cost zero, and enumerates every loopless path of each
+# graph by brute force. Every engine and mode must return the paths of the
+# enumeration: in order of cost, loopless, each with the cost of its edges, and
+# the graph unmodified afterwards. Sets of sources and sinks that share a node
+# must be rejected.
+#
+# The timing runs every engine on a larger random graph and compares the time
+# of one call of each to a stored baseline, failing when an engine is slower
+# than its baseline by more than a threshold. Each engine is called in batches
+# of at least _timing_run seconds and the fastest of _timing_repeat batches is
+# kept. The batches of the engines take turns, so a slow spell of the machine
+# does not fall on every batch of one engine. The baseline is machine specific,
+# so it is created on the first run, or recreated with --update.
+#
+# usage: harness.py [-h] [-s SEEDS] [--no-check] [--no-timing] [--update]
+#                   [-b BASELINE] [-t THRESHOLD]
+
+## The location of the timing baseline.
+_path_baseline = "data/baseline.json"
+
+## The amount of nodes and edges of the random graphs that are checked.
+_check_size = (7, 20)
+
+## The amount of nodes and edges of the random graphs that are timed.
+_timing_size = (2000, 12000)
+
+## The least amount of seconds each timed batch of calls of an engine takes.
+_timing_run = 0.1
+
+## The amount of timed batches of each engine, the fastest is kept.
+_timing_repeat = 10
+
+## The engines that are timed. Each is the name of the engine and a function
+# of a DiGraph and the same graph as a CompactGraph.
+_workloads = [
+    ("dijkstra", lambda graph, graph_c: algorithms.dijkstra(graph, "N0")),
+    ("delta_stepping", lambda graph, graph_c:
+        sssp.delta_stepping(graph_c, "N0")),
+    ("ksp_yen", lambda graph, graph_c:
+        algorithms.ksp_yen(graph, "N0", "N1", 10)),
+    ("ksp_yen_compact", lambda graph, graph_c:
+        algorithms.ksp_yen(graph_c, "N0", "N1", 10)),
+    ("ksp_yen_sets", lambda graph, graph_c:
+        algorithms.ksp_yen(graph, ["N0", "N2"], ["N1", "N3"], 10)),
+    ("ksp_budget", lambda graph, graph_c:
+        list(itertools.islice(algorithms.ksp_budget(graph, "N0", "N1",
+                                                    graph.INFINITY - 1), 10))),
+    ("ksp_disjoint", lambda graph, graph_c:
+        algorithms.ksp_disjoint(graph, "N0", "N1", 3)),
+    ("ksp_disjoint_nodes", lambda graph, graph_c:
+        algorithms.ksp_disjoint(graph, "N0", "N1", 3, True)),
+]
+
+## Parses the arguments, runs the check and the timing.
+#
+# @param argv The command line arguments, if not specified sys.argv is used.
+#
+# @retval int The exit status, 1 if any check or timing failed.
+#
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Checks the shortest path "
+                                     "engines against a brute force oracle "
+                                     "and a timing baseline.")
+    parser.add_argument("-s", "--seeds", type=int, default=200,
+                        help="the amount of random graphs checked")
+    parser.add_argument("--no-check", action="store_true",
+                        help="skip the check against the oracle")
+    parser.add_argument("--no-timing", action="store_true",
+                        help="skip the timing")
+    parser.add_argument("--update", action="store_true",
+                        help="store the timings as the new baseline")
+    parser.add_argument("-b", "--baseline", default=_path_baseline,
+                        help="the timing baseline file")
+    parser.add_argument("-t", "--threshold", type=float, default=0.25,
+                        help="the allowed slow down relative to the baseline")
+    args = parser.parse_args(argv)
+
+    failures = []
+    if not args.no_check:
+        failures += check(args.seeds)
+        print "check: %d graphs, %d failures" % (args.seeds, len(failures))
+
+    if not args.no_timing:
+        timings = time_engines()
+        baseline = load_baseline(args.baseline)
+        for name, seconds in sorted(timings.iteritems()):
+            print "%-20s %10.6f s\tbaseline %s" % (name, seconds,
+                                                    baseline.get(name, "-"))
+
+        if args.update or not baseline:
+            save_baseline(args.baseline, timings)
+            print "baseline stored in %s" % args.baseline
+        else:
+            failures += compare(timings, baseline, args.threshold)
+
+    for failure in failures:
+        print "FAIL", failure
+
+    return 1 if failures else 0
+
+## Checks every engine and mode on random graphs against the oracle.
+#
+# @param seeds The amount of random graphs, each generated from its seed.
+#
+# @retval [] List of the description of every failure.
+#
+def check(seeds=200):
+    failures = []
+    directory = tempfile.mkdtemp()
+    directory_cells = partition.Overlay._directory_data
+    partition.Overlay._directory_data = directory + "/"
+    # Split even the small buckets of the check between the workers.
+    min_parallel = sssp._MIN_PARALLEL
+    sssp._MIN_PARALLEL = 1
+
+    try:
+        for seed in xrange(seeds):
+            graph = DiGraph()
+            graph.random(_check_size[0], _check_size[1], 9, seed=seed)
+            if seed % 4 == 3:
+                _zero_costs(graph)
+            failures += ["seed %d: %s" % (seed, failure) for failure in
+                         check_graph(graph, seed)]
+    finally:
+        partition.Overlay._directory_data = directory_cells
+        sssp._MIN_PARALLEL = min_parallel
+        shutil.rmtree(directory, True)
+
+    return failures
+
+## Sets the cost of every edge of cost one to zero.
+#
+# @param graph The DiGraph that is modified.
+#
+def _zero_costs(graph):
+    for v in list(graph):
+        for u, cost in graph[v].items():
+            if cost == 1:
+                graph.add_edge(v, u, 0)
+
+    return
+
+## Checks every engine and mode on a single graph.
+#
+# @param graph The DiGraph that is checked.
+# @param seed The seed of the graph, used to vary the queries.
+#
+# @retval [] List of the description of every failure.
+#
+def check_graph(graph, seed):
+    failures = []
+    nodes = sorted(graph)
+    source, sink = nodes[0], nodes[1]
+    sources, sinks = nodes[0::3], set(nodes[1::3])
+    before = json.dumps(graph._data, sort_keys=True)
+    graph_c = compact.from_digraph(graph)
+
+    expected = oracle(graph, [source], set([sink]))
+    expected_sets = oracle(graph, sources, sinks)
+
+    # Shortest paths from one node to one node, and to every node.
+    cost = expected[0][0] if expected else graph.INFINITY
+    if algorithms.dijkstra(graph, source, sink)['cost'] != cost:
+        failures.append("dijkstra cost")
+
+    distances = dict((v, min([c for c, p in oracle(graph, [source],
+                                                   set([v]))] or
+                             [graph.INFINITY])) for v in graph)
+    distances[source] = 0
+    if algorithms.dijkstra(graph, source)[0] != distances:
+        failures.append("dijkstra distances")
+    if sssp.delta_stepping(graph, source)[0] != distances:
+        failures.append("delta_stepping distances")
+    if sssp.delta_stepping(graph, source, 10 / 6.0)[0] != distances:
+        failures.append("delta_stepping distances with delta 10/6")
+    if apsp.AllPairs(graph).distances(source) != distances:
+        failures.append("AllPairs distances")
+    if seed % 10 == 0 and \
+       sssp.delta_stepping(graph, source, workers=2)[0] != distances:
+        failures.append("delta_stepping distances with 2 workers")
+
+    # K shortest paths in every mode.
+    for max_k in (1, 3, 10):
+        failures += check_paths("ksp_yen K=%d" % max_k, graph,
+                                algorithms.ksp_yen(graph, source, sink, max_k),
+                                expected[:max_k], [source], [sink])
+        failures += check_paths("ksp_yen compact K=%d" % max_k, graph,
+                                algorithms.ksp_yen(graph_c, source, sink,
+                                                   max_k),
+                                expected[:max_k], [source], [sink])
+        failures += check_paths("ksp_yen sets K=%d" % max_k, graph,
+                                algorithms.ksp_yen(graph, sources, sinks,
+                                                   max_k),
+                                expected_sets[:max_k], sources, sinks)
+
+    for max_cost in (0, 10, 25):
+        failures += check_paths("ksp_budget %d" % max_cost, graph,
+                                list(algorithms.ksp_budget(graph, source, sink,
+                                                           max_cost)),
+                                [item for item in expected
+                                 if item[0] <= max_cost], [source], [sink])
+
+    search = algorithms.YenSearch(graph, source, sink, 10)
+    while not search.run(max_calls=2)[1]:
+        pass
+    failures += check_paths("YenSearch", graph, search.run()[0],
+                            expected[:10], [source], [sink])
+
+    for nodes_only in (False, True):
+        for max_k in (1, 2, 3):
+            failures += check_disjoint(graph, source, sink, max_k, nodes_only,
+                                       expected)
+
+    failures += check_shared(graph, sources, sinks)
+
+    # The trace of a search between node sets, and the partition overlay.
+    if seed % 10 == 0:
+        failures += check_trace(graph, sources, sinks)
+
+        overlay = partition.partition(graph, "harness", 3)
+        if overlay.dijkstra(source, sink)['cost'] != cost:
+            failures.append("Overlay dijkstra cost")
+        failures += check_paths("Overlay ksp_yen", graph,
+                                overlay.ksp_yen(source, sink, 10),
+                                expected[:10], [source], [sink])
+
+    if json.dumps(graph._data, sort_keys=True) != before:
+        failures.append("graph modified")
+
+    return failures
+
+## Checks that every engine rejects sets of sources and sinks that share a 
+# node.
+#
+# @param graph The graph.
+# @param sources The list of source nodes.
+# @param sinks The set of sink nodes.
+#
+# @retval [] List of the description of every failure.
+#
+def check_shared(graph, sources, sinks):
+    sinks = sinks | set(sources[:1])
+    engines = [
+        ("dijkstra", lambda: algorithms.dijkstra(graph, sources, sinks)),
+        ("ksp_yen", lambda: algorithms.ksp_yen(graph, sources, sinks, 3)),
+        ("ksp_budget", lambda: list(algorithms.ksp_budget(graph, sources,
+                                                          sinks, 25))),
+        ("YenSearch", lambda: algorithms.YenSearch(graph, sources, sinks,
+                                                   3).run()),
+        ("ksp_disjoint", lambda: algorithms.ksp_disjoint(graph, sources,
+                                                         sinks, 3)),
+    ]
+
+    failures = []
+    for name, engine in engines:
+        try:
+            engine()
+        except ValueError:
+            continue
+        failures.append("%s accepted sources and sinks sharing %s" %
+                        (name, sources[0]))
+
+    return failures
+
+## Checks that a trace of ksp_yen between node sets can be saved, loaded and 
+# replayed. The frames are painted into a temporary directory.
+#
+# @param graph The graph.
+# @param sources The list of source nodes.
+# @param sinks The set of sink nodes.
+#
+# @retval [] List of the description of every failure.
+#
+def check_trace(graph, sources, sinks):
+    failures = []
+    directory = tempfile.mkdtemp()
+
+    try:
+        trace = tracer.YenTrace()
+        algorithms.ksp_yen(graph, sources, sinks, 3, trace)
+        trace.save(os.path.join(directory, "trace.json"))
+        loaded = tracer.YenTrace()
+        loaded.load(os.path.join(directory, "trace.json"))
+        if list(loaded) != list(trace):
+            failures.append("trace differs once loaded")
+
+        painter = Graphviz()
+        painter._directory_data = painter._directory_images = directory + "/"
+        tracer.replay(loaded, graph, painter)
+        frames = [name for name in os.listdir(directory)
+                  if name.endswith(".dot")]
+        if len(frames) != len(loaded):
+            failures.append("trace replay painted %d of %d frames" %
+                            (len(frames), len(loaded)))
+    except (TypeError, ValueError, KeyError), error:
+        failures.append("trace %s: %s" % (error.__class__.__name__, error))
+    finally:
+        shutil.rmtree(directory, True)
+
+    return failures
+
+## Checks K shortest paths against the paths of the oracle.
+#
+# @param name The name of the engine and mode.
+# @param graph The graph of the paths.
+# @param paths The list of paths returned by the engine.
+# @param expected The list of (cost, path) of the oracle.
+# @param sources The sources of the paths.
+# @param sinks The sinks of the paths.
+#
+# @retval [] List of the description of every failure.
+#
+def check_paths(name, graph, paths, expected, sources, sinks):
+    paths = [item for item in paths if item['path']]
+    failures = []
+
+    if [item['cost'] for item in paths] != [cost for cost, path in expected]:
+        failures.append("%s costs %s, expected %s" %
+                        (name, [item['cost'] for item in paths],
+                         [cost for cost, path in expected]))
+
+    routes = [tuple(item['path']) for item in paths]
+    if len(set(routes)) != len(routes):
+        failures.append("%s duplicate paths" % name)
+
+    for item, route in zip(paths, routes):
+        if len(set(route)) != len(route):
+            failures.append("%s loop %s" % (name, route))
+        elif route[0] not in sources or route[-1] not in sinks:
+            failures.append("%s endpoints %s" % (name, route))
+        elif _cost(graph, route) != item['cost']:
+            failures.append("%s cost of %s" % (name, route))
+
+    return failures
+
+## Checks disjoint paths against the best combination of oracle paths.
+#
+# @param graph The graph of the paths.
+# @param source The source node.
+# @param sink The sink node.
+# @param max_k The amount of paths.
+# @param nodes_only True for node disjoint paths, False for edge disjoint.
+# @param expected The list of (cost, path) of the oracle.
+#
+# @retval [] List of the description of every failure.
+#
+def check_disjoint(graph, source, sink, max_k, nodes_only, expected):
+    name = "ksp_disjoint K=%d nodes=%s" % (max_k, nodes_only)
+    paths = algorithms.ksp_disjoint(graph, source, sink, max_k, nodes_only)
+
+    best = None
+    for size in xrange(max_k, 0, -1):
+        for combination in itertools.combinations(expected, size):
+            routes = [route for cost, route in combination]
+            if _disjoint(routes, nodes_only):
+                total = sum(cost for cost, route in combination)
+                if best is None or total < best[1]:
+                    best = (size, total)
+        if best is not None:
+            break
+
+    failures = check_paths(name, graph, paths, sorted(
+        (item['cost'], tuple(item['path'])) for item in paths),
+        [source], [sink])
+    if (len(paths), sum(item['cost'] for item in paths)) != (best or (0, 0)):
+        failures.append("%s total %s, expected %s" %
+                        (name, (len(paths), sum(item['cost']
+                                                for item in paths)), best))
+    if not _disjoint([item['path'] for item in paths], nodes_only):
+        failures.append("%s not disjoint" % name)
+
+    return failures
+
+## Enumerates every loopless path from a set of sources to a set of sinks.
+#
+# @param graph The graph.
+# @param sources The list of source nodes.
+# @param sinks The set of sink nodes.
+#
+# @retval [] List of the (cost, path) of every path, ordered by cost, where
+# the path is a tuple of nodes.
+#
+def oracle(graph, sources, sinks):
+    found = []
+
+    def extend(route, cost):
+        if route[-1] in sinks and len(route) > 1:
+            found.append((cost, tuple(route)))
+        for node_to, cost_edge in graph[route[-1]].iteritems():
+            if cost_edge < graph.INFINITY and node_to not in route:
+                route.append(node_to)
+                extend(route, cost + cost_edge)
+                route.pop()
+
+    for source in sources:
+        extend([source], 0)
+
+    return sorted(found, key=lambda item: item[0])
+
+## Times every engine on a random graph. Every round times one batch of each
+# engine, with the garbage collector disabled.
+#
+# @param repeat The amount of rounds, the fastest batch of each engine is kept.
+# @param run The least amount of seconds a batch takes, the amount of calls in
+# a batch is chosen from a first untimed call.
+#
+# @retval {} Dictionary of the name of every engine and the seconds taken by
+# one call.
+#
+def time_engines(repeat=_timing_repeat, run=_timing_run):
+    graph = DiGraph()
+    graph.random(_timing_size[0], _timing_size[1], 20, seed=1)
+    graph_c = compact.from_digraph(graph)
+
+    calls = {}
+    for name, workload in _workloads:
+        started = time.time()
+        workload(graph, graph_c)
+        calls[name] = int(run / max(time.time() - started, 1e-6)) + 1
+
+    timings = {}
+    enabled = gc.isenabled()
+    gc.disable()
+    try:
+        for i in xrange(repeat):
+            for name, workload in _workloads:
+                started = time.time()
+                for j in xrange(calls[name]):
+                    workload(graph, graph_c)
+                seconds = (time.time() - started) / calls[name]
+                if not timings.has_key(name) or seconds < timings[name]:
+                    timings[name] = seconds
+    finally:
+        if enabled:
+            gc.enable()
+
+    return timings
+
+## Compares timings to a baseline.
+#
+# @param timings Dictionary of the name of every engine and its time.
+# @param baseline Dictionary of the name of every engine and its stored time.
+# @param threshold The allowed slow down, e.g. 0.25 for 25% slower.
+#
+# @retval [] List of the description of every regression.
+#
+def compare(timings, baseline, threshold):
+    failures = []
+    for name, seconds in sorted(timings.iteritems()):
+        if baseline.has_key(name) and \
+           seconds > baseline[name] * (1 + threshold):
+            failures.append("%s took %.6f s, baseline %.6f s" %
+                            (name, seconds, baseline[name]))
+
+    return failures
+
+## Loads the timing baseline.
+#
+# @param path The path of the baseline.
+#
+# @retval {} Dictionary of the name of every engine and its time, empty if no
+# baseline is stored.
+#
+def load_baseline(path):
+    if not os.path.exists(path):
+        return {}
+
+    fhandle = open(path, 'r')
+    baseline = json.loads(fhandle.read())
+    fhandle.close()
+
+    return baseline
+
+## Stores the timing baseline.
+#
+# @param path The path of the baseline.
+# @param timings Dictionary of the name of every engine and its time.
+#
+def save_baseline(path, timings):
+    fhandle = open(path, 'w')
+    fhandle.write(json.dumps(timings, indent=1, sort_keys=True))
+    fhandle.close()
+
+    return
+
+## The cost of a path.
+#
+# @param graph The graph of the path.
+# @param route Sequence of the nodes of the path.
+#
+# @retval int The sum of the cost of its edges.
+#
+def _cost(graph, route):
+    return sum(graph[v][u] for v, u in zip(route, route[1:]))
+
+## Determines whether paths are disjoint.
+#
+# @param routes List of the sequences of the nodes of the paths.
+# @param nodes_only True if the paths may not share a node other than their
+# first and last, False if they may not share an edge.
+#
+# @retval bool True if the paths are disjoint.
+#
+def _disjoint(routes, nodes_only):
+    used = set()
+    for route in routes:
+        if nodes_only:
+            items = route[1:-1]
+        else:
+            items = zip(route, route[1:])
+        for item in items:
+            if item in used:
+                return False
+            used.add(item)
+
+    return True
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,538 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+#  partition.py
+#
+#  Copyright 2012 Kevin R <KRPent@gmail.com>
+#
+#  This program is free software; you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation; either version 2 of the License, or
+#  (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software
+#  Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston,
+#  MA 02110-1301, USA.
+#
+#
+import os
+import json
+import zlib
+import collections
+import multiprocessing
+import algorithms
+from graph import DiGraph
+
+
+## @package partition
+# Splits a graph into cells and routes over a boundary overlay of the cells.
+#
+# Every node belongs to one cell. An edge between two cells is a cut edge, the
+# nodes a cut edge enters are the entries of their cell and the nodes a cut
+# edge leaves are its exits. For every cell the distance from each entry to
+# each exit, through the cell alone, is precomputed as a clique of shortcut
+# edges. The overlay is the graph of the boundary nodes, the cliques and the
+# cut edges, which is much smaller than the graph.
+#
+# A query only loads the cells of its source and sink. Every other cell is
+# crossed by its shortcuts, which are unpacked into the nodes of the cell
+# afterwards. ksp_yen may need alternatives that cross a cell by other than its
+# shortest route, so the cells that the shortcuts of its paths cross are
+# opened and the paths recomputed, until no path uses a shortcut.
+#
+# The cells are stored in the "data/cells/" folder, one file per cell, so each
+# cell can be loaded on its own. Node names must be strings, as in DiGraph.
+
+## @brief The overlay of a partitioned graph, loaded from disk.
+class Overlay:
+    ## The location that the cells are stored.
+    _directory_data = "data/cells/"
+
+    ## An edge with this cost signifies that it has been removed from the graph.
+    INFINITY = DiGraph.INFINITY
+
+    ## The identifier of the graph.
+    _name = None
+
+    ## The amount of cells.
+    _num_cells = 0
+
+    ## Dictionary of every boundary node to its cell.
+    _boundary = None
+
+    ## Dictionary of the edges of the overlay. Each key is a boundary node and
+    # the value is a dictionary of its shortcuts and cut edges and their cost.
+    _edges = None
+
+    ## Dictionary of the cut edges leaving each boundary node.
+    _cut = None
+
+    ## Dictionary of the loaded cells by their number.
+    _cells = None
+
+    ## Loads the overlay of a partitioned graph.
+    #
+    # @pre The graph has been partitioned with partition.
+    #
+    # @param self The object pointer.
+    # @param name The identifier of the graph.
+    #
+    def __init__(self, name):
+        self._name = name
+        self._cells = {}
+
+        fhandle = open(self._path("overlay"), 'r')
+        stored = json.loads(fhandle.read())
+        fhandle.close()
+
+        self._num_cells = stored['cells']
+        self._cut = stored['cut']
+        self._boundary = dict((node, int(c)) for node, c in
+                              stored['boundary'].iteritems())
+
+        self._edges = dict((node, {}) for node in self._boundary)
+        for clique in stored['cliques'].itervalues():
+            for node, edges in clique.iteritems():
+                self._edges[node].update(edges)
+        for node, edges in self._cut.iteritems():
+            self._edges[node].update(edges)
+
+        return
+
+    ## The path of a stored file of the graph.
+    #
+    # @param self The object pointer.
+    # @param item The name of the file without extension.
+    # @retval "" The path of the file.
+    #
+    def _path(self, item):
+        return "%s%s/%s.json" % (self._directory_data, self._name, item)
+
+    ## The cell of a node, read from the stored index.
+    #
+    # @param self The object pointer.
+    # @param node The name of the node.
+    # @retval int The number of the cell, or None if the node is not in the
+    # graph.
+    #
+    def cell_of(self, node):
+        if self._boundary.has_key(node):
+            return self._boundary[node]
+
+        fhandle = open(self._path("index-%d" % _shard(node, self._num_cells)),
+                       'r')
+        index = json.loads(fhandle.read())
+        fhandle.close()
+
+        return index.get(node)
+
+    ## Loads a cell, or gets it if it was loaded before.
+    #
+    # @param self The object pointer.
+    # @param c The number of the cell.
+    # @retval {} Dictionary of the nodes of the cell, each with a dictionary of
+    # the edges to the nodes of the same cell and their cost.
+    #
+    def cell(self, c):
+        if not self._cells.has_key(c):
+            self._cells[c] = load_cell(self._path("cell-%d" % c))['edges']
+
+        return self._cells[c]
+
+    ## Builds the graph of the overlay with some cells opened, i.e. with the
+    # nodes and edges of the cells in place of their shortcuts.
+    #
+    # @param self The object pointer.
+    # @param cells The numbers of the cells to open.
+    # @retval OverlayGraph The graph, see DiGraph.
+    #
+    def graph(self, cells):
+        return OverlayGraph(self, cells)
+
+    ## Computes the shortest path between two nodes, see algorithms.dijkstra.
+    #
+    # @param self The object pointer.
+    # @param node_start The source node.
+    # @param node_end The sink node.
+    # @retval {} Dictionary of path and cost, the path is an empty list if no
+    # path exist.
+    #
+    def dijkstra(self, node_start, node_end):
+        cells = [self.cell_of(node_start), self.cell_of(node_end)]
+        if None in cells:
+            return {'cost': self.INFINITY, 'path': []}
+
+        graph = self.graph(cells)
+        result = algorithms.dijkstra(graph, node_start, node_end)
+
+        return {'cost': result['cost'],
+                'path': graph.unpack(result['path'])}
+
+    ## Computes K shortest loopless paths between two nodes, see
+    # algorithms.ksp_yen.
+    #
+    # @param self The object pointer.
+    # @param node_start The source node.
+    # @param node_end The sink node.
+    # @param max_k The amount of paths being computed.
+    # @retval [] Array of Path objects ordered by cost.
+    #
+    def ksp_yen(self, node_start, node_end, max_k=2):
+        cells = set([self.cell_of(node_start), self.cell_of(node_end)])
+        if None in cells:
+            return [algorithms.Path(self.INFINITY, ())]
+
+        while True:
+            graph = self.graph(cells)
+            A = algorithms.ksp_yen(graph, node_start, node_end, max_k)
+
+            # A path that crosses a cell by a shortcut may hide a cheaper path
+            # that crosses it by another route, unless no path uses one.
+            crossed = set()
+            for path_k in A:
+                crossed.update(graph.shortcuts(path_k.nodes))
+            if not crossed:
+                return A
+
+            cells |= crossed
+
+
+## @brief The graph of an overlay with some of its cells opened.
+#
+# The graph has the interface of DiGraph, including remove_edge and add_edge,
+# so algorithms.dijkstra and algorithms.ksp_yen can run on it. Only the edges
+# of nodes that are modified or in an opened cell are held by the graph, the
+# rest are read from the overlay.
+class OverlayGraph:
+    ## An edge with this cost signifies that it has been removed from the graph.
+    INFINITY = DiGraph.INFINITY
+
+    ## Represents a NULL predecessor.
+    UNDEFINDED = DiGraph.UNDEFINDED
+
+    ## The overlay of the graph.
+    _overlay = None
+
+    ## The set of the numbers of the opened cells.
+    _open = None
+
+    ## Dictionary of the edges of the nodes that differ from the overlay.
+    _data = None
+
+    ## Initializes the graph.
+    #
+    # @param self The object pointer.
+    # @param overlay The Overlay of the graph.
+    # @param cells The numbers of the cells to open.
+    #
+    def __init__(self, overlay, cells):
+        self._overlay = overlay
+        self._open = set(cell for cell in cells if cell is not None)
+        self._data = {}
+
+        for c in self._open:
+            for node, edges in overlay.cell(c).iteritems():
+                edges = dict(edges)
+                edges.update(overlay._cut.get(node, {}))
+                self._data[node] = edges
+
+        return
+
+    ## Gets the edges of a specified node.
+    #
+    # @param self The object pointer.
+    # @param node The node whose edges are being queried.
+    # @retval {} A dictionary of the edges and thier cost if the node exist
+    # within the graph or None if the node is not in the graph.
+    #
+    def __getitem__(self, node):
+        edges = self._data.get(node)
+        if edges is None:
+            edges = self._overlay._edges.get(node)
+
+        return edges
+
+    ## Iterator for the graph object.
+    #
+    # @param self The object pointer.
+    # @retval iter An iterator over the nodes of the graph.
+    #
+    def __iter__(self):
+        for node in self._data:
+            yield node
+        for node in self._overlay._edges:
+            if not self._data.has_key(node):
+                yield node
+
+    ## Removes an edge from the graph by setting its cost to infinity.
+    #
+    # @param self The object pointer.
+    # @param node_from The node that the edge starts at.
+    # @param node_to The node that the edge terminates at.
+    # @param cost The cost of the edge, if the cost is not specified the edge
+    # is removed regardless of its cost.
+    # @retval int The cost of the edge that was removed, or -1, see DiGraph.
+    #
+    def remove_edge(self, node_from, node_to, cost=None):
+        edges = self[node_from]
+        if edges is None or not edges.has_key(node_to):
+            return -1
+
+        current = edges[node_to]
+        if current == self.INFINITY or (cost and current != cost):
+            return -1
+
+        self._modify(node_from)[node_to] = self.INFINITY
+        return current
+
+    ## Sets the cost of an edge of the graph.
+    #
+    # @param self The object pointer.
+    # @param node_from The node that the edge starts at.
+    # @param node_to The node that the edge terminates at.
+    # @param cost The cost of the edge.
+    #
+    def add_edge(self, node_from, node_to, cost):
+        self._modify(node_from)[node_to] = cost
+
+        return
+
+    ## Gets the edges of a node held by the graph, copying them from the
+    # overlay first if needed.
+    #
+    # @param self The object pointer.
+    # @param node The node whose edges are modified.
+    # @retval {} The dictionary of edges that may be modified.
+    #
+    def _modify(self, node):
+        if not self._data.has_key(node):
+            self._data[node] = dict(self._overlay._edges.get(node, {}))
+
+        return self._data[node]
+
+    ## Finds the shortcuts of a path, i.e. its edges that cross a cell that is
+    # not opened.
+    #
+    # @param self The object pointer.
+    # @param nodes Sequence of the nodes of the path.
+    # @retval [] List of the number of the cell of each shortcut.
+    #
+    def shortcuts(self, nodes):
+        boundary = self._overlay._boundary
+        cells = []
+        for v, u in zip(nodes, nodes[1:]):
+            c = boundary.get(v)
+            if c is not None and c not in self._open and boundary.get(u) == c:
+                cells.append(c)
+
+        return cells
+
+    ## Replaces every shortcut of a path with the shortest route through its
+    # cell.
+    #
+    # @param self The object pointer.
+    # @param nodes Sequence of the nodes of the path.
+    # @retval [] The list of nodes of the unpacked path.
+    #
+    def unpack(self, nodes):
+        boundary = self._overlay._boundary
+        route = list(nodes[:1])
+        for v, u in zip(nodes, nodes[1:]):
+            c = boundary.get(v)
+            if c is not None and c not in self._open and boundary.get(u) == c:
+                cell = algorithms.DataGraph(self._overlay.cell(c))
+                route.extend(algorithms.dijkstra(cell, v, u)['path'][1:])
+            else:
+                route.append(u)
+
+        return route
+
+
+## Partitions a graph into cells, computes the clique of every cell and stores
+# the cells and the overlay.
+#
+# @post There exist a folder of the name of the graph in the directory
+# specified by Overlay._directory_data with the overlay, the cells and the
+# index of the cell of every node.
+#
+# @param graph A digraph of class Graph, or any graph with the same interface.
+# @param name The identifier the partition is stored as.
+# @param cell_size The maximum amount of nodes of a cell.
+# @param workers The amount of processes the cliques are computed by, if not
+# specified a single process is used.
+#
+# @retval Overlay The overlay of the partitioned graph.
+#
+def partition(graph, name, cell_size=1000, workers=None):
+    directory = "%s%s/" % (Overlay._directory_data, name)
+    if not os.path.exists(directory):
+        os.makedirs(directory)
+
+    cell = _assign(graph, cell_size)
+    num_cells = max(cell.itervalues()) + 1 if cell else 0
+
+    # Sort the nodes and edges into their cells, the cut edges into the
+    # overlay and the cell of every node into the shards of the index.
+    cells = [{'edges': {}, 'entries': set(), 'exits': set()}
+             for c in xrange(num_cells)]
+    index = [{} for c in xrange(num_cells)]
+    cut = {}
+    for v in graph:
+        c = cell[v]
+        cells[c]['edges'][v] = {}
+        index[_shard(v, num_cells)][v] = c
+        for u, cost in graph[v].iteritems():
+            if cost >= graph.INFINITY:
+                continue
+            if cell[u] == c:
+                cells[c]['edges'][v][u] = cost
+            else:
+                cut.setdefault(v, {})[u] = cost
+                cells[c]['exits'].add(v)
+                cells[cell[u]]['entries'].add(u)
+
+    paths = []
+    for c in xrange(num_cells):
+        path = "%scell-%d.json" % (directory, c)
+        _dump(path, {'edges': cells[c]['edges'],
+                     'entries': sorted(cells[c]['entries']),
+                     'exits': sorted(cells[c]['exits'])})
+        _dump("%sindex-%d.json" % (directory, c), index[c])
+        paths.append(path)
+    del cells, index
+
+    if workers > 1:
+        pool = multiprocessing.Pool(workers)
+        cliques = pool.map(_clique, paths)
+        pool.close()
+        pool.join()
+    else:
+        cliques = map(_clique, paths)
+
+    boundary = {}
+    for c, path in enumerate(paths):
+        stored = load_cell(path)
+        for node in stored['entries'] + stored['exits']:
+            boundary[node] = c
+
+    _dump("%soverlay.json" % directory,
+          {'cells': num_cells, 'cut': cut, 'boundary': boundary,
+           'cliques': dict((c, clique) for c, clique in enumerate(cliques))})
+
+    return Overlay(name)
+
+## Loads a stored cell.
+#
+# @param path The path of the cell.
+#
+# @retval {} Dictionary of the edges, entries and exits of the cell.
+#
+def load_cell(path):
+    fhandle = open(path, 'r')
+    stored = json.loads(fhandle.read())
+    fhandle.close()
+
+    return stored
+
+## Computes the clique of a cell, i.e. the distance from each entry to each
+# exit of the cell through the cell alone. Runs in a worker process, which
+# only loads the cell.
+#
+# @param path The path of the cell.
+#
+# @retval {} Dictionary of each entry to a dictionary of every exit it reaches
+# and the distance.
+#
+def _clique(path):
+    stored = load_cell(path)
+    graph = algorithms.DataGraph(stored['edges'])
+
+    clique = {}
+    for entry in stored['entries']:
+        distances = algorithms.dijkstra(graph, entry)[0]
+        clique[entry] = dict((node, distances[node]) for node in
+                             stored['exits'] if node != entry and
+                             distances[node] < DiGraph.INFINITY)
+
+    return clique
+
+## Assigns every node of a graph to a cell by growing each cell breadth first
+# from a node that has no cell yet, ignoring the direction of the edges, and
+# then moving every node whose neighbours are mostly in another cell that has
+# room for it.
+#
+# @param graph The graph being partitioned.
+# @param cell_size The maximum amount of nodes of a cell.
+#
+# @retval {} Dictionary of every node to the number of its cell.
+#
+def _assign(graph, cell_size):
+    neighbours = dict((v, set()) for v in graph)
+    for v in graph:
+        for u, cost in graph[v].iteritems():
+            if cost < graph.INFINITY and u != v:
+                neighbours[v].add(u)
+                neighbours[u].add(v)
+
+    cell = {}
+    sizes = []
+    for seed in graph:
+        if cell.has_key(seed):
+            continue
+
+        c = len(sizes)
+        cell[seed] = c
+        size = 1
+        queue = collections.deque([seed])
+        while queue and size < cell_size:
+            for u in neighbours[queue.popleft()]:
+                if not cell.has_key(u):
+                    cell[u] = c
+                    size += 1
+                    queue.append(u)
+                    if size >= cell_size:
+                        break
+        sizes.append(size)
+
+    for v in graph:
+        counts = collections.Counter(cell[u] for u in neighbours[v])
+        if not counts:
+            continue
+
+        c, count = counts.most_common(1)[0]
+        if count > counts[cell[v]] and sizes[c] < cell_size and \
+           sizes[cell[v]] > 1:
+            sizes[cell[v]] -= 1
+            sizes[c] += 1
+            cell[v] = c
+
+    return cell
+
+## The shard of the index that holds the cell of a node.
+#
+# @param node The name of the node.
+# @param num_shards The amount of shards.
+#
+# @retval int The number of the shard.
+#
+def _shard(node, num_shards):
+    return (zlib.crc32(unicode(node).encode('utf-8')) & 0xffffffff) % \
+           max(num_shards, 1)
+
+## Stores an object as json.
+#
+# @param path The path of the file.
+# @param data The object to store.
+#
+def _dump(path, data):
+    fhandle = open(path, 'w')
+    fhandle.write(json.dumps(data))
+    fhandle.close()
+
+    return
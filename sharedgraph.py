@@ -0,0 +1,267 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+#  sharedgraph.py
+#
+#  Copyright 2012 Kevin R <KRPent@gmail.com>
+#
+#  This program is free software; you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation; either version 2 of the License, or
+#  (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software
+#  Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston,
+#  MA 02110-1301, USA.
+#
+#
+import os
+import json
+import mmap
+import ctypes
+import struct
+import tempfile
+import compact
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
+## @package sharedgraph
+# Shares one frozen copy of a graph between processes.
+#
+# A graph is published once as the flat arrays of a CompactGraph in a named
+# memory mapped segment, in "/dev/shm/" where it exists so the segment never
+# touches the disk. Any process can then attach to the segment by name. The
+# arrays of an attached graph are views of the mapped memory, so every process
+# reads the same physical pages and attaching copies nothing but the node
+# names. With numpy the arrays are read only. Each process keeps its own overlay of removed edges, see CompactGraph,
+# so dijkstra and ksp_yen can run on an attached graph concurrently.
+#
+# A process pool shares a graph by attaching in its initializer:
+#
+#     pool = multiprocessing.Pool(4, sharedgraph.init_worker, ("net",))
+#
+# after which sharedgraph.worker_graph() is the graph in every worker.
+
+## The identifier at the start of every segment.
+_MAGIC = "YENKSP01"
+
+## The layout of the header after the identifier: the amount of nodes, the
+# amount of edges, whether the costs are floats, and the length of the names.
+_HEADER = struct.Struct("<qqqq")
+
+## The graph attached by init_worker.
+_worker = None
+
+## @brief A CompactGraph whose arrays live in a shared memory segment.
+class SharedGraph(compact.CompactGraph):
+    ## The file object of the segment.
+    _fhandle = None
+
+    ## The memory map of the segment.
+    _map = None
+
+    ## The path of the segment.
+    _path = None
+
+    ## Attaches to a published segment. With numpy the segment is mapped read
+    # only, so no process can modify the graph that every process shares. The
+    # ctypes arrays used without numpy require a writable mapping.
+    #
+    # @pre The segment has been published with publish.
+    #
+    # @param self The object pointer.
+    # @param name The name the graph was published as.
+    #
+    def __init__(self, name):
+        self._path = _path(name)
+        if numpy is not None:
+            self._fhandle = open(self._path, 'rb')
+            self._map = mmap.mmap(self._fhandle.fileno(), 0,
+                                  access=mmap.ACCESS_READ)
+        else:
+            self._fhandle = open(self._path, 'r+b')
+            self._map = mmap.mmap(self._fhandle.fileno(), 0)
+
+        position = len(_MAGIC)
+        if self._map[:position] != _MAGIC:
+            raise ValueError("%s is not a published graph" % self._path)
+
+        num_nodes, num_edges, floats, size = _HEADER.unpack_from(self._map,
+                                                                 position)
+        position += _HEADER.size
+        names = json.loads(self._map[position:position + size])
+        position += _padded(size)
+
+        offsets = _view(self._map, position, num_nodes + 1, False)
+        position += 8 * (num_nodes + 1)
+        targets = _view(self._map, position, num_edges, False)
+        position += 8 * num_edges
+        costs = _view(self._map, position, num_edges, floats)
+
+        compact.CompactGraph.__init__(self, names, offsets, targets, costs)
+
+        return
+
+    ## Detaches from the segment. The graph can not be used afterwards.
+    #
+    # @param self The object pointer.
+    #
+    def close(self):
+        self._offsets = self._targets = self._costs = None
+        self._map.close()
+        self._fhandle.close()
+
+        return
+
+    ## Removes the segment, once every process has detached the memory is
+    # freed.
+    #
+    # @param self The object pointer.
+    #
+    def unlink(self):
+        if os.path.exists(self._path):
+            os.remove(self._path)
+
+        return
+
+
+## Publishes a frozen copy of a graph as a shared memory segment.
+#
+# @post There exist a segment with the supplied name that processes can attach
+# to until it is unlinked.
+#
+# @param graph A digraph of class Graph, or a CompactGraph.
+# @param name The name of the segment.
+#
+# @retval SharedGraph The graph attached to the new segment.
+#
+def publish(graph, name):
+    if not isinstance(graph, compact.CompactGraph):
+        graph = compact.from_digraph(graph)
+
+    offsets, targets, costs = graph.arrays()
+    names = json.dumps(graph.names())
+    floats = int(_floats(costs))
+
+    # Write to a temporary path first, so no process can attach to a segment
+    # that is only partly written.
+    path = _path(name)
+    path_temp = "%s.%d" % (path, os.getpid())
+    fhandle = open(path_temp, 'wb')
+    fhandle.write(_MAGIC)
+    fhandle.write(_HEADER.pack(len(graph), graph.num_edges(), floats,
+                               len(names)))
+    fhandle.write(names + "\0" * (_padded(len(names)) - len(names)))
+    fhandle.write(_pack(offsets, False))
+    fhandle.write(_pack(targets, False))
+    fhandle.write(_pack(costs, floats))
+    fhandle.close()
+    os.rename(path_temp, path)
+
+    return SharedGraph(name)
+
+## Attaches to a published graph.
+#
+# @param name The name of the segment.
+#
+# @retval SharedGraph The attached graph.
+#
+def attach(name):
+    return SharedGraph(name)
+
+## Attaches a worker process to a published graph, for use as the initializer
+# of a multiprocessing.Pool.
+#
+# @param name The name of the segment.
+#
+def init_worker(name):
+    global _worker
+
+    _worker = attach(name)
+
+    return
+
+## The graph attached by init_worker in this process.
+#
+# @retval SharedGraph The attached graph, or None.
+#
+def worker_graph():
+    return _worker
+
+## The path of the segment of a name.
+#
+# @param name The name of the segment.
+#
+# @retval "" The path of the memory mapped file.
+#
+def _path(name):
+    directory = "/dev/shm" if os.path.isdir("/dev/shm") else \
+                tempfile.gettempdir()
+
+    return os.path.join(directory, "yenksp-%s" % name)
+
+## Rounds a length of bytes up to a multiple of eight, so the arrays that
+# follow are aligned.
+#
+# @param size The length in bytes.
+#
+# @retval int The padded length.
+#
+def _padded(size):
+    return (size + 7) // 8 * 8
+
+## Creates an array view of a part of a memory map, without copying it.
+#
+# @param buffer The memory map.
+# @param offset The position of the array in bytes.
+# @param count The amount of values in the array.
+# @param floats True for an array of doubles, False for 64 bit integers.
+#
+# @retval The numpy array, or ctypes array without numpy.
+#
+def _view(buffer, offset, count, floats):
+    if numpy is not None:
+        return numpy.frombuffer(buffer, numpy.float64 if floats else
+                                numpy.int64, count, offset)
+
+    ctype = ctypes.c_double if floats else ctypes.c_int64
+    return (ctype * count).from_buffer(buffer, offset)
+
+## Converts an array of the graph into its bytes in the segment.
+#
+# @param values The numpy array, array.array or sequence of values.
+# @param floats True for doubles, False for 64 bit integers.
+#
+# @retval "" The packed values.
+#
+def _pack(values, floats):
+    if numpy is not None:
+        return numpy.asarray(values, numpy.float64 if floats else
+                             numpy.int64).tostring()
+
+    ctype = ctypes.c_double if floats else ctypes.c_int64
+    return buffer((ctype * len(values))(*compact._tolist(values)))[:]
+
+## Determines whether an array of costs holds floats.
+#
+# @param costs The numpy array, array.array or sequence of costs.
+#
+# @retval bool True if any cost is a float.
+#
+def _floats(costs):
+    if hasattr(costs, 'dtype'):
+        return costs.dtype.kind == 'f'
+    if hasattr(costs, 'typecode'):
+        return costs.typecode in 'fd'
+
+    return compact._typecode(costs) == 'd'
@@ -0,0 +1,329 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+#  sssp.py
+#
+#  Copyright 2012 Kevin R <KRPent@gmail.com>
+#
+#  This program is free software; you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation; either version 2 of the License, or
+#  (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software
+#  Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston,
+#  MA 02110-1301, USA.
+#
+#
+import ctypes
+import multiprocessing
+from multiprocessing.sharedctypes import RawArray
+import compact
+from graph import DiGraph
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
+## @package sssp
+# Computes single-source shortest paths with the delta-stepping algorithm.
+#
+# Delta-stepping keeps the tentative distances in buckets of width delta. All
+# the nodes of the lowest bucket are settled together: the light edges, of cost
+# at most delta, are relaxed repeatedly until the bucket is empty, and then the
+# heavy edges of every node removed from the bucket are relaxed once. With
+# numpy, each relaxation of a whole bucket is a handful of array operations over
+# the compact graph, instead of one heap operation per edge.
+
+## The least amount of nodes relaxed at once that is split between processes.
+_MIN_PARALLEL = 4096
+
+## Computes the shortest paths from a source to every node of the graph.
+# The result is the same as dijkstra(graph, node_start), so the two can be
+# swapped for each other.
+#
+# @param graph A digraph of class Graph, or a CompactGraph.
+# @param node_start The source node of the graph.
+# @param delta The width of a bucket, if not specified the average edge cost.
+# @param workers The amount of processes the relaxations of large buckets are
+# split between, if not specified a single process is used. This requires
+# numpy.
+#
+# @retval () The distances and previous dictionaries, see dijkstra.
+#
+def delta_stepping(graph, node_start, delta=None, workers=None):
+    if numpy is None:
+        return _delta_stepping_dict(graph, node_start, delta)
+
+    if not isinstance(graph, compact.CompactGraph):
+        graph = compact.from_digraph(graph)
+    start = graph.index(node_start)
+    if start is None:
+        raise KeyError(node_start)
+
+    offsets, targets, costs = [numpy.asarray(values) for values in
+                               graph.arrays()]
+    finite = costs < graph.INFINITY
+    if delta is None:
+        delta = costs[finite].mean() if finite.any() else 1
+    delta = delta if delta > 0 else 1
+
+    if costs.dtype.kind == 'f':
+        dist = numpy.empty(len(graph), dtype=numpy.float64)
+        unreached = numpy.inf
+    else:
+        dist = numpy.empty(len(graph), dtype=numpy.int64)
+        unreached = numpy.iinfo(numpy.int64).max // 2
+    pred = numpy.empty(len(graph), dtype=numpy.int64)
+
+    pool = None
+    if workers > 1:
+        shared = [_shared(values) for values in (offsets, targets, costs,
+                                                 dist)]
+        offsets, targets, costs, dist = [numpy.frombuffer(raw, values.dtype)
+                                         for raw, values in
+                                         zip(shared, (offsets, targets,
+                                                      costs, dist))]
+        pool = multiprocessing.Pool(workers, _init_worker,
+                                    shared + [costs.dtype.char,
+                                              dist.dtype.char])
+
+    dist.fill(unreached)
+    pred.fill(-1)
+    dist[start] = 0
+
+    relax = lambda nodes, light: _relax(pool, workers, nodes, light, delta,
+                                        offsets, targets, costs, dist, pred)
+
+    # The nodes that are reached but not settled yet, i.e. the members of
+    # every bucket after the current one, so no bucket scans all the nodes. A
+    # node is in the bucket of the floor of its distance over delta, the same
+    # arithmetic decides the current bucket and its members.
+    bucket = lambda nodes: numpy.floor_divide(dist[nodes], delta)
+    pending = numpy.array([start], dtype=numpy.int64)
+    while len(pending):
+        current = bucket(pending).min()
+
+        inside = bucket(pending) <= current
+        active = pending[inside]
+        reached = [pending[~inside]]
+        removed = []
+        while len(active):
+            removed.append(active)
+            improved = relax(active, True)
+            inside = bucket(improved) <= current
+            active = improved[inside]
+            reached.append(improved[~inside])
+
+        # A pending node whose distance dropped into the bucket was settled
+        # with it. The heavy edges lead past the bucket, but any node they
+        # improve stays pending even if rounding puts it in the bucket.
+        later = numpy.unique(numpy.concatenate(reached))
+        later = later[bucket(later) > current]
+        heavy = relax(numpy.unique(numpy.concatenate(removed)), False)
+        pending = numpy.unique(numpy.concatenate((later, heavy)))
+
+    if pool is not None:
+        pool.close()
+        pool.join()
+
+    return _result(graph, dist.tolist(), pred.tolist())
+
+## Relaxes the light or heavy edges of a set of nodes and applies every
+# improvement to the distances.
+#
+# @retval array The indices of the nodes whose distance improved.
+#
+def _relax(pool, workers, nodes, light, delta, offsets, targets, costs, dist,
+           pred):
+    if pool is not None and len(nodes) >= _MIN_PARALLEL:
+        chunks = numpy.array_split(nodes, workers)
+        found = pool.map(_relax_worker, [(chunk, light, delta)
+                                         for chunk in chunks])
+        nodes_to, dist_to, nodes_from = [numpy.concatenate(values) for values
+                                         in zip(*found)]
+    else:
+        nodes_to, dist_to, nodes_from = _candidates(nodes, light, delta,
+                                                    offsets, targets, costs,
+                                                    dist)
+
+    if not len(nodes_to):
+        return nodes_to
+
+    # Keep the best candidate of every node, i.e. the first of each node
+    # once sorted by node and distance.
+    order = numpy.lexsort((dist_to, nodes_to))
+    nodes_to = nodes_to[order]
+    first = numpy.ones(len(nodes_to), dtype=bool)
+    first[1:] = nodes_to[1:] != nodes_to[:-1]
+
+    nodes_to = nodes_to[first]
+    dist_to = dist_to[order][first]
+    nodes_from = nodes_from[order][first]
+
+    better = dist_to < dist[nodes_to]
+    nodes_to = nodes_to[better]
+    dist[nodes_to] = dist_to[better]
+    pred[nodes_to] = nodes_from[better]
+
+    return nodes_to
+
+## Finds the relaxations of the light or heavy edges of a set of nodes that
+# improve on the current distances.
+#
+# @retval () Arrays of the node each improvement reaches, its distance, and
+# the node it comes from.
+#
+def _candidates(nodes, light, delta, offsets, targets, costs, dist):
+    starts = offsets[nodes]
+    counts = offsets[nodes + 1] - starts
+    total = int(counts.sum())
+    if not total:
+        empty = numpy.empty(0, dtype=numpy.int64)
+        return (empty, empty.astype(dist.dtype), empty)
+
+    # The index of every edge of the nodes, in the order of the nodes.
+    firsts = numpy.cumsum(counts) - counts
+    edges = numpy.arange(total) + numpy.repeat(starts - firsts, counts)
+    nodes_from = numpy.repeat(nodes, counts)
+
+    weights = costs[edges]
+    if light:
+        keep = weights <= delta
+    else:
+        keep = (weights > delta) & (weights < DiGraph.INFINITY)
+
+    edges = edges[keep]
+    nodes_from = nodes_from[keep]
+    nodes_to = targets[edges]
+    dist_to = dist[nodes_from] + weights[keep]
+
+    better = dist_to < dist[nodes_to]
+    return (nodes_to[better], dist_to[better], nodes_from[better])
+
+## The arrays of the graph shared with the worker processes.
+_worker_arrays = None
+
+## Attaches a worker process to the shared arrays of the graph.
+#
+# @param offsets The shared offsets array.
+# @param targets The shared targets array.
+# @param costs The shared costs array.
+# @param dist The shared distances array.
+# @param cost_type The numpy type code of the costs.
+# @param dist_type The numpy type code of the distances.
+#
+def _init_worker(offsets, targets, costs, dist, cost_type, dist_type):
+    global _worker_arrays
+
+    _worker_arrays = (numpy.frombuffer(offsets, numpy.int64),
+                      numpy.frombuffer(targets, numpy.int64),
+                      numpy.frombuffer(costs, numpy.dtype(cost_type)),
+                      numpy.frombuffer(dist, numpy.dtype(dist_type)))
+
+    return
+
+## Finds the candidates of a chunk of nodes in a worker process.
+#
+# @param job A tuple of the nodes, whether light edges are relaxed, and delta.
+#
+# @retval () See _candidates.
+#
+def _relax_worker(job):
+    nodes, light, delta = job
+
+    return _candidates(nodes, light, delta, *_worker_arrays)
+
+## Copies a numpy array into memory shared with child processes.
+#
+# @param values The numpy array.
+#
+# @retval RawArray The shared copy of the array.
+#
+def _shared(values):
+    ctype = ctypes.c_double if values.dtype.kind == 'f' else ctypes.c_int64
+    raw = RawArray(ctype, len(values))
+    numpy.frombuffer(raw, values.dtype)[:] = values
+
+    return raw
+
+## Converts the distance and predecessor of every node index into the
+# dictionaries returned by dijkstra.
+#
+# @retval () The distances and previous dictionaries.
+#
+def _result(graph, dist, pred):
+    distances = {}
+    previous = {}
+    for i, name in enumerate(graph.names()):
+        if dist[i] < graph.INFINITY:
+            distances[name] = dist[i]
+            previous[name] = graph.name(pred[i]) if pred[i] >= 0 else \
+                             graph.UNDEFINDED
+        else:
+            distances[name] = graph.INFINITY
+            previous[name] = graph.UNDEFINDED
+
+    return (distances, previous)
+
+## Computes delta-stepping without numpy, with a dictionary of buckets.
+#
+# @param graph A digraph of class Graph, or any graph with the same interface.
+# @param node_start The source node of the graph.
+# @param delta The width of a bucket, if not specified the average edge cost.
+#
+# @retval () The distances and previous dictionaries, see dijkstra.
+#
+def _delta_stepping_dict(graph, node_start, delta):
+    if delta is None:
+        weights = [cost for v in graph for cost in graph[v].itervalues()
+                   if cost < graph.INFINITY]
+        delta = float(sum(weights)) / len(weights) if weights else 1
+    delta = delta if delta > 0 else 1
+    if graph[node_start] is None:
+        raise KeyError(node_start)
+
+    distances = {node_start: 0}
+    previous = {node_start: graph.UNDEFINDED}
+    buckets = {0: set([node_start])}
+
+    def relax(nodes, light):
+        for v in nodes:
+            for u, cost in graph[v].iteritems():
+                if (cost <= delta) != light or cost >= graph.INFINITY:
+                    continue
+
+                cost_vu = distances[v] + cost
+                if cost_vu < distances.get(u, graph.INFINITY):
+                    if distances.has_key(u):
+                        buckets.get(int(distances[u] // delta),
+                                    set()).discard(u)
+                    distances[u] = cost_vu
+                    previous[u] = v
+                    buckets.setdefault(int(cost_vu // delta), set()).add(u)
+
+    while buckets:
+        bucket = min(buckets)
+        removed = set()
+        while buckets.get(bucket):
+            active = buckets.pop(bucket)
+            removed |= active
+            relax(active, True)
+
+        buckets.pop(bucket, None)
+        relax(removed, False)
+
+    for v in graph:
+        if not distances.has_key(v):
+            distances[v] = graph.INFINITY
+            previous[v] = graph.UNDEFINDED
+
+    return (distances, previous)
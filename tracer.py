@@ -0,0 +1,223 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+#  tracer.py
+#
+#  Copyright 2012 Kevin R <KRPent@gmail.com>
+#
+#  This program is free software; you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation; either version 2 of the License, or
+#  (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software
+#  Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston,
+#  MA 02110-1301, USA.
+#
+#
+import json
+
+
+## @brief Records the steps of ksp_yen so they can be painted afterwards.
+#
+# A trace is passed to ksp_yen, which records every spur step and every path
+# chosen into it. Each event is a tuple whose first item is the kind of event.
+#
+# A spur event is (SPUR, k, node_spur, path_root, edges_removed, path_spur,
+# cost_spur, container_b), where edges_removed is a tuple of the removed edges
+# as (node_from, node_to), path_spur is the spur path or None if no spur path
+# was found, and container_b is a tuple of the (cost, path) of every potential
+# path in B after the step. When ksp_yen runs on sets of sources or sinks, the 
+# virtual nodes are left out of the events and node_spur is None for the spur
+# step at the start of the paths.
+#
+# A select event is (SELECT, k, cost, path) for the path chosen as A^k.
+#
+# Every path in an event is a tuple of nodes.
+class YenTrace:
+    ## Kind of event recorded for each spur node.
+    SPUR = 0
+    ## Kind of event recorded for each path added to A.
+    SELECT = 1
+
+    ## The list of recorded events.
+    _events = None
+
+    ## Initializes an empty trace.
+    #
+    # @param self The object pointer.
+    #
+    def __init__(self):
+        self._events = []
+
+        return
+
+    ## Iterator for the trace object.
+    #
+    # @param self The object pointer.
+    # @retval iter An iterator over the events in the order they were recorded.
+    #
+    def __iter__(self):
+        return iter(self._events)
+
+    ## The amount of events in the trace.
+    #
+    # @param self The object pointer.
+    # @retval int The amount of events.
+    #
+    def __len__(self):
+        return len(self._events)
+
+    ## Records a spur step.
+    #
+    # @param self The object pointer.
+    # @param k The index of the path being computed.
+    # @param node_spur The spur node.
+    # @param path_root The root path, from the source to the spur node.
+    # @param edges_removed List of the removed edges as [node_from, node_to,
+    # cost].
+    # @param path_spur Dictionary of the cost and path of the spur path, or
+    # None if no spur path was found.
+    # @param container_b List of dictionaries of the cost and path of the
+    # potential paths.
+    #
+    def spur(self, k, node_spur, path_root, edges_removed, path_spur,
+             container_b):
+        if path_spur:
+            spur = (tuple(path_spur['path']), path_spur['cost'])
+        else:
+            spur = (None, None)
+
+        self._events.append((self.SPUR, k, node_spur, tuple(path_root),
+                             tuple((edge[0], edge[1]) for edge in
+                                   edges_removed)) + spur +
+                            (tuple((item['cost'], tuple(item['path']))
+                                   for item in container_b),))
+
+        return
+
+    ## Records a path chosen as A^k.
+    #
+    # @param self The object pointer.
+    # @param k The index of the path.
+    # @param path_k Dictionary of the cost and path.
+    #
+    def select(self, k, path_k):
+        self._events.append((self.SELECT, k, path_k['cost'],
+                             tuple(path_k['path'])))
+
+        return
+
+    ## Stores the trace as json, one event per line.
+    #
+    # @post There exist a file at the supplied path with the events.
+    #
+    # @param self The object pointer.
+    # @param path The path of the file.
+    #
+    def save(self, path):
+        fhandle = open(path, 'w')
+        for event in self._events:
+            fhandle.write(json.dumps(event) + "\n")
+        fhandle.close()
+
+        return
+
+    ## Populates the trace with the events stored by save.
+    #
+    # @param self The object pointer.
+    # @param path The path of the file.
+    #
+    def load(self, path):
+        self._events = []
+
+        fhandle = open(path, 'r')
+        for line in fhandle:
+            self._events.append(_tuples(json.loads(line)))
+        fhandle.close()
+
+        return
+
+
+## Paints a frame for every event of a trace.
+# Each spur frame paints the paths already in A, the root path, the removed
+# edges and the spur path, with the cost of the root path plus the spur path,
+# and each select frame paints the path chosen. The frames are rendered as a
+# batch, see Graphviz.begin_batch.
+#
+# @pre The graph holds the nodes and edges the trace was recorded on.
+# @post The frames of the trace will be in the images folder of the painter.
+#
+# @param trace The YenTrace to replay.
+# @param graph A digraph of class Graph.
+# @param painter The Graphviz object to paint with, if not specified the
+# painter of the graph is used.
+# @param animation The file name of an animation assembled from the frames,
+# see Graphviz.end_batch.
+#
+# @retval bool True if every frame was rendered successfully, False otherwise.
+#
+def replay(trace, graph, painter=None, animation=None):
+    if not painter:
+        painter = graph.painter()
+
+    A = []
+    painter.begin_batch()
+    for event in trace:
+        painter.clear_paths()
+        painter.clear_infinite_edges()
+        painter.clear_legend_text()
+
+        for path_a in A:
+            painter.add_path(path_a, "#babdb6", "#babdb6")
+
+        if event[0] == YenTrace.SPUR:
+            k, node_spur, path_root, edges_removed, path_spur = event[1:6]
+            cost_root = sum(graph[node_from][node_to] for node_from, node_to
+                            in zip(path_root, path_root[1:]))
+
+            for edge in edges_removed:
+                painter.add_infinite_edge(edge[0], edge[1])
+            if path_spur:
+                painter.add_path(path_spur, "#8ae234", "#4e9a06")
+            painter.add_path(path_root, "#729fcf", "#3465a4")
+
+            painter.add_legend_text("K = %d" % (k + 1))
+            painter.add_legend_text("Spur: %s" % ("any source" if node_spur
+                                                  is None else node_spur))
+            if path_spur:
+                painter.add_legend_text("Cost: %s + %s = %s" %
+                                        (cost_root, event[6],
+                                         cost_root + event[6]))
+            else:
+                painter.add_legend_text("Cost: %s + no spur path" % cost_root)
+            painter.add_legend_text("B: %d paths" % len(event[7]))
+        else:
+            k, cost, path_k = event[1:]
+            A.append(path_k)
+
+            painter.add_path(path_k, "#fcaf3e", "#f57900")
+            painter.add_legend_text("K = %d" % (k + 1))
+            painter.add_legend_text("Cost: %s" % cost)
+
+        graph.export(True, painter)
+
+    return painter.end_batch(animation)
+
+## Converts the lists of a loaded json event back into tuples.
+#
+# @param value A value of a loaded event.
+#
+# @retval The value with every list replaced by a tuple.
+#
+def _tuples(value):
+    if isinstance(value, list):
+        return tuple(_tuples(item) for item in value)
+
+    return value